@@ -0,0 +1,127 @@
+import os
+import time
+import inspect
+import hashlib
+import tempfile
+import threading
+from .telemetry import telemetry
+
+class ArtifactTooLarge(Exception):
+    pass
+
+class ArtifactStore:
+    # Files produced by the Spaces. Clients are asked to return references (URLs on the Space) instead of
+    # downloading every output, so an image can go from one stage to the next without a download and upload
+    # round trip. Only the files needed locally (previews, models to import) are streamed into the staging
+    # directory, with a size cap, and staged files are deleted once they are older than max_age.
+
+    def __init__(self, directory=None, max_file_size=512 * 1024 ** 2, max_age=24 * 3600, chunk_size=1024 ** 2):
+        self.directory = directory or os.path.join(tempfile.gettempdir(), "autosculptor-staging")
+        self.max_file_size = max_file_size
+        self.max_age = max_age
+        self.chunk_size = chunk_size
+        self.downloaded = 0
+        self._session = None
+        self._lock = threading.Lock()
+
+    def configure(self, directory=None, max_file_size=None, max_age=None):
+        with self._lock:
+            if directory:
+                self.directory = directory
+            if max_file_size is not None:
+                self.max_file_size = max_file_size
+            if max_age is not None:
+                self.max_age = max_age
+
+    def client_options(self):
+        # gradio_client 1.x can skip downloads entirely, older versions can at least download into the staging directory
+        from gradio_client import Client
+        parameters = inspect.signature(Client.__init__).parameters
+        if "download_files" in parameters:
+            return {"download_files": False}
+        if "output_dir" in parameters:
+            os.makedirs(self.directory, exist_ok=True)
+            return {"output_dir": self.directory}
+        return {}
+
+    def reference(self, value):
+        # File outputs come back as local paths, URLs or FileData dicts depending on the client version
+        if isinstance(value, dict):
+            return value.get("url") or value.get("path") or value.get("name")
+        if isinstance(value, (list, tuple)):
+            return type(value)(self.reference(entry) for entry in value)
+        return value
+
+    def local(self, value, api_key=None):
+        # Returns a local path for a file reference, downloading remote files into the staging directory
+        value = self.reference(value)
+        if not is_remote(value):
+            return value
+
+        name = hashlib.sha256(value.encode("utf-8")).hexdigest()[:32] + file_extension(value)
+        path = os.path.join(self.directory, name)
+        if os.path.isfile(path):
+            os.utime(path, None)
+            return path
+
+        os.makedirs(self.directory, exist_ok=True)
+        headers = {"Authorization": f"Bearer {api_key}"} if api_key else {}
+        partial = f"{path}.{threading.get_ident()}.tmp"
+        size = 0
+        try:
+            with telemetry.span("download", url=value) as fields:
+                with self._get_session().get(value, headers=headers, stream=True, timeout=(10, 60)) as response:
+                    response.raise_for_status()
+                    length = int(response.headers.get("Content-Length") or 0)
+                    if length > self.max_file_size:
+                        raise ArtifactTooLarge(f"{value} is {length} bytes, over the {self.max_file_size} bytes limit")
+                    with open(partial, "wb") as file:
+                        for chunk in response.iter_content(chunk_size=self.chunk_size):
+                            size += len(chunk)
+                            fields["bytes"] = size
+                            if size > self.max_file_size:
+                                raise ArtifactTooLarge(f"{value} is over the {self.max_file_size} bytes limit")
+                            file.write(chunk)
+                os.replace(partial, path)
+        finally:
+            if os.path.exists(partial):
+                os.remove(partial)
+
+        with self._lock:
+            self.downloaded += size
+        return path
+
+    def collect_garbage(self):
+        # Deletes staged files older than max_age and partial downloads left by crashed runs, returns the bytes freed
+        if not os.path.isdir(self.directory):
+            return 0
+        now = time.time()
+        freed = 0
+        for entry in os.scandir(self.directory):
+            try:
+                if not entry.is_file():
+                    continue
+                stat = entry.stat()
+                max_age = 3600 if entry.name.endswith(".tmp") else self.max_age
+                if now - stat.st_mtime > max_age:
+                    os.remove(entry.path)
+                    freed += stat.st_size
+            except OSError:
+                pass
+        return freed
+
+    def _get_session(self):
+        with self._lock:
+            if self._session is None:
+                import requests
+                self._session = requests.Session()
+            return self._session
+
+def is_remote(value):
+    return isinstance(value, str) and value.startswith(("http://", "https://"))
+
+def file_extension(url):
+    extension = os.path.splitext(url.split("?", 1)[0])[1]
+    return extension if len(extension) <= 8 else ""
+
+artifact_store = ArtifactStore()
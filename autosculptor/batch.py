@@ -0,0 +1,230 @@
+# Headless batch generation from a prompt list.
+#
+# Usage:
+#   blender --background --python autosculptor/batch.py -- prompts.jsonl --output out/ [--workers 2] [--blend]
+#
+# Each JSONL line (or CSV row) needs a "prompt" and may override "id", "model_type", "seed",
+# "guidance_scale", "num_inference_steps", "image_width" and "image_height".
+# Finished items are written to out/<id>.glb and recorded in out/progress.jsonl, so an
+# interrupted run can be started again with the same command and only does what is left.
+# Several model types (a JSON list, or joined with "+" in CSV) share their SDXL image and
+# are written to out/<id>-<model_type>.glb.
+
+import os
+import sys
+import csv
+import json
+import queue
+import shutil
+import hashlib
+import argparse
+import threading
+
+if __name__ == "__main__" and not __package__:
+    # Run as a script by Blender, make the relative imports below resolve to the add-on package
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    import autosculptor
+    __package__ = "autosculptor"
+
+from .pipeline import run_staged
+from .engine import Engine, registry, selected_model_types, DEFAULT_SETTINGS
+from .artifacts import artifact_store
+
+DEFAULTS = {
+    name: DEFAULT_SETTINGS[name]
+    for name in ("guidance_scale", "num_inference_steps", "image_width", "image_height")
+}
+INT_FIELDS = ("seed", "guidance_scale", "num_inference_steps", "image_width", "image_height")
+
+def read_prompts(path):
+    with open(path, "r", encoding="utf-8", newline="") as file:
+        if path.lower().endswith(".csv"):
+            rows = list(csv.DictReader(file))
+        else:
+            rows = [json.loads(line) for line in file if line.strip()]
+
+    for row in rows:
+        if isinstance(row.get("model_type"), str):
+            # CSV cells are often written as "a + b", surrounding spaces are not part of the names
+            model_types = [model_type.strip() for model_type in row["model_type"].split("+")]
+            row["model_type"] = model_types if len(model_types) > 1 else model_types[0]
+        if not row.get("model_type"):
+            row.pop("model_type", None)
+        for field in INT_FIELDS:
+            if row.get(field) not in (None, ""):
+                row[field] = int(row[field])
+            else:
+                row.pop(field, None)
+    return rows
+
+def item_id(row):
+    payload = json.dumps({key: value for key, value in row.items() if key != "id"}, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+def read_checkpoint(path):
+    done = set()
+    if os.path.isfile(path):
+        with open(path, "r", encoding="utf-8") as file:
+            for line in file:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    # Last line of a crashed run may be cut short
+                    continue
+                if entry.get("status") == "done":
+                    done.add(entry["id"])
+    return done
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(prog="autosculptor.batch", description="Generate 3D models for a list of prompts.")
+    parser.add_argument("input", help="JSONL or CSV file of prompts and parameters")
+    parser.add_argument("--output", required=True, help="Directory receiving the GLB files and the progress checkpoint")
+    parser.add_argument("--model-type", nargs="+", default=DEFAULT_SETTINGS["model_types"], choices=list(registry), help="Pipelines used when a row does not set any, several share their SDXL image")
+    parser.add_argument("--workers", type=int, default=1, help="Concurrent calls per pipeline stage")
+    parser.add_argument("--retries", type=int, default=2, help="Retries per failing stage")
+    parser.add_argument("--api-key", default=os.environ.get("HF_TOKEN"), help="Hugging Face token (defaults to $HF_TOKEN)")
+    parser.add_argument("--cache-dir", help="Result cache directory (defaults to the add-on cache)")
+    parser.add_argument("--no-cache", action="store_true", help="Disable the result cache")
+    parser.add_argument("--cache-size", type=int, default=8192, help="Result cache size in MB")
+    parser.add_argument("--blend", action="store_true", help="Also save each model into its own .blend file")
+    parser.add_argument("--no-material", action="store_true", help="Do not assign the vertex color material in .blend files")
+    return parser.parse_args(argv)
+
+def output_paths(output, row_id, model_types):
+    if len(model_types) == 1:
+        return {model_types[0]: os.path.join(output, row_id + ".glb")}
+    return {model_type: os.path.join(output, f"{row_id}-{model_type}.glb") for model_type in model_types}
+
+def run(args):
+    try:
+        # gradio_client installed with the Install Dependencies button lives in the add-on's own folder,
+        # which is only on sys.path once the add-on is registered
+        from .utils import add_site_packages
+        add_site_packages()
+    except ImportError:
+        # Not run by Blender, the current environment has to provide gradio_client
+        pass
+
+    os.makedirs(args.output, exist_ok=True)
+    checkpoint_path = os.path.join(args.output, "progress.jsonl")
+    done = read_checkpoint(checkpoint_path)
+
+    # Group pending rows by pipeline, seeds default to a hash of the row so a resumed run reuses cached stages
+    groups = {}
+    skipped = 0
+    for row in read_prompts(args.input):
+        row.setdefault("model_type", args.model_type if len(args.model_type) > 1 else args.model_type[0])
+        row_id = str(row.get("id") or item_id(row))
+        model_types = selected_model_types(row)
+        paths = output_paths(args.output, row_id, model_types)
+        if row_id in done or (all(os.path.isfile(path) for path in paths.values()) and not args.blend):
+            skipped += 1
+            continue
+
+        item = dict(DEFAULTS)
+        item.update(row)
+        item["id"] = row_id
+        item["model_type"] = " + ".join(model_types)
+        item["outputs"] = paths
+        item.setdefault("seed", int(item_id(row)[:8], 16) % 2147483647)
+        item["api_key"] = args.api_key or None
+        unknown = [model_type for model_type in model_types if model_type not in registry]
+        if unknown:
+            print(f"Autosculptor batch: skipping {row_id}, unknown model type {', '.join(unknown)}")
+            continue
+        groups.setdefault(tuple(model_types), []).append(item)
+
+    pending = sum(len(items) for items in groups.values())
+    print(f"Autosculptor batch: {pending} items to generate, {skipped} already done")
+
+    cache_dir = args.cache_dir
+    if cache_dir is None and not args.no_cache:
+        from .utils import get_cache_dir
+        cache_dir = get_cache_dir()
+    engine = Engine(cache_dir=cache_dir)
+    artifact_store.collect_garbage()
+    cache = engine.get_cache(dict(DEFAULT_SETTINGS, use_cache=not args.no_cache, cache_size=args.cache_size))
+    checkpoint_lock = threading.Lock()
+    finished = queue.Queue()
+    branch_errors = {}
+
+    def record(item, status, error=""):
+        with checkpoint_lock:
+            with open(checkpoint_path, "a", encoding="utf-8") as file:
+                file.write(json.dumps({"id": item["id"], "status": status, "seed": item["seed"], "prompt": item["prompt"], "error": error}) + "\n")
+                file.flush()
+                os.fsync(file.fileno())
+
+    def on_branch_error(branch, e, steps_left):
+        with checkpoint_lock:
+            branch_errors.setdefault(branch["id"], []).append(f"{branch['model_type']}: {str(e)}")
+
+    def on_result(item):
+        models = item.get("models", {model_type: item.get("model_path") for model_type in item["outputs"]})
+        for model_type, model_path in models.items():
+            glb_path = item["outputs"][model_type]
+            shutil.copyfile(model_path, glb_path + ".tmp")
+            os.replace(glb_path + ".tmp", glb_path)
+
+        errors = branch_errors.pop(item["id"], [])
+        if errors:
+            # Run again to retry the missing backends, the finished ones come from the cache
+            on_error(item, Exception("; ".join(errors)))
+        elif args.blend:
+            finished.put(item)
+        else:
+            record(item, "done")
+            print(f"Autosculptor batch: {item['id']} done")
+
+    def on_error(item, e):
+        record(item, "failed", str(e))
+        print(f"Autosculptor batch: {item['id']} failed: {str(e)}")
+
+    def generate():
+        try:
+            for model_types, items in groups.items():
+                stages = engine.build_fan_out(list(model_types), args.retries, cache, on_branch_error=on_branch_error)
+                run_staged(stages, items, workers=args.workers, on_result=on_result, on_error=on_error)
+        finally:
+            finished.put(None)
+
+    worker = threading.Thread(target=generate, daemon=True)
+    worker.start()
+
+    # .blend files can only be written from the main thread, while later items keep generating
+    while True:
+        item = finished.get()
+        if item is None:
+            break
+        try:
+            save_blend(item, os.path.join(args.output, item["id"] + ".blend"), not args.no_material)
+            record(item, "done")
+            print(f"Autosculptor batch: {item['id']} done")
+        except Exception as e:
+            record(item, "failed", str(e))
+            print(f"Autosculptor batch: {item['id']} failed to save: {str(e)}")
+
+    worker.join()
+
+def save_blend(item, path, apply_material):
+    import bpy
+    from .operators import import_generated_model, COMPARE_SPACING
+
+    # Only the previous row's models are removed, reloading factory settings would also disable the add-on
+    for obj in list(bpy.data.objects):
+        bpy.data.objects.remove(obj)
+    for mesh in list(bpy.data.meshes):
+        bpy.data.meshes.remove(mesh)
+    for index, (model_type, glb_path) in enumerate(item["outputs"].items()):
+        obj = import_generated_model(glb_path, apply_material, model_type=model_type)
+        if obj is not None:
+            obj.location.x += index * COMPARE_SPACING
+    bpy.ops.wm.save_as_mainfile(filepath=path, copy=True)
+
+def main(argv=None):
+    if argv is None:
+        argv = sys.argv[sys.argv.index("--") + 1:] if "--" in sys.argv else sys.argv[1:]
+    run(parse_args(argv))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+import os
+import glob
+import json
+import shutil
+import hashlib
+import threading
+from functools import wraps
+from .artifacts import artifact_store, is_remote
+
+CACHE_VERSION = 1
+
+class ResultCache:
+    # Content-addressed store for stage outputs: files are kept as <key><ext>, plain values as <key>.value.json.
+    # Least recently used entries are evicted once the directory grows past max_size bytes.
+
+    def __init__(self, directory, max_size=2 * 1024 ** 3):
+        self.directory = directory
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def key(self, stage_name, params, inputs):
+        payload = json.dumps({"version": CACHE_VERSION, "stage": stage_name, "params": params, "inputs": inputs}, sort_keys=True)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key):
+        with self._lock:
+            value_path = os.path.join(self.directory, key + ".value.json")
+            if os.path.isfile(value_path):
+                with open(value_path, "r", encoding="utf-8") as file:
+                    value = json.load(file)["value"]
+                self._touch(value_path)
+                self.hits += 1
+                return value
+
+            for path in glob.glob(os.path.join(self.directory, key + ".*")):
+                if path.endswith(".tmp"):
+                    continue
+                self._touch(path)
+                self.hits += 1
+                return path
+
+            self.misses += 1
+            return None
+
+    def put(self, key, value):
+        with self._lock:
+            if isinstance(value, str) and os.path.isfile(value):
+                if os.path.getsize(value) > self.max_size:
+                    # Would be evicted right away, the stage output is used uncached
+                    return value
+                ext = os.path.splitext(value)[1]
+                path = os.path.join(self.directory, key + ext)
+                shutil.copyfile(value, path + ".tmp")
+                os.replace(path + ".tmp", path)
+                result = path
+            else:
+                path = os.path.join(self.directory, key + ".value.json")
+                with open(path + ".tmp", "w", encoding="utf-8") as file:
+                    json.dump({"value": value}, file)
+                os.replace(path + ".tmp", path)
+                result = value
+
+            self._evict(keep=path)
+            return result
+
+    def clear(self):
+        with self._lock:
+            for path in self._entries():
+                os.remove(path)
+
+    def size(self):
+        with self._lock:
+            return sum(os.path.getsize(path) for path in self._entries())
+
+    def stats(self):
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses}
+
+    def reset_stats(self):
+        with self._lock:
+            self.hits = 0
+            self.misses = 0
+
+    def _entries(self):
+        return [
+            entry.path for entry in os.scandir(self.directory)
+            if entry.is_file() and not entry.name.endswith(".tmp")
+        ]
+
+    def _touch(self, path):
+        try:
+            os.utime(path, None)
+        except OSError:
+            pass
+
+    def _evict(self, keep=None):
+        entries = [(os.path.getmtime(path), os.path.getsize(path), path) for path in self._entries()]
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_size:
+                break
+            if path == keep:
+                continue
+            os.remove(path)
+            total -= size
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+def get_result_cache(directory, max_size):
+    with _caches_lock:
+        cache = _caches.get(directory)
+        if cache is None:
+            cache = _caches[directory] = ResultCache(directory, max_size)
+        cache.max_size = max_size
+        return cache
+
+def cached_stage(stage, cache):
+    # Wraps a pipeline stage so its output is looked up by a hash of its parameters and upstream artifact keys
+    @wraps(stage)
+    def wrapper(item):
+        keys = item.setdefault("cache_keys", {})
+        key = cache.key(
+            stage.__name__,
+            {name: item[name] for name in stage.params},
+            {name: keys.get(name, item.get(name)) for name in stage.inputs}
+        )
+
+        value = cache.get(key)
+        if value is None:
+            stage(item)
+            output = item[stage.output]
+            value = cache.put(key, artifact_store.local(output, item.get("api_key")))
+            if is_remote(output):
+                # The cache keeps a local copy, the next stage can still pass the Space its own file
+                value = output
+
+        item[stage.output] = value
+        keys[stage.output] = key
+    return wrapper
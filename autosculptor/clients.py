@@ -0,0 +1,124 @@
+import threading
+import time
+from contextlib import contextmanager
+from .telemetry import telemetry
+from .artifacts import artifact_store
+
+class ClientPool:
+    # Keeps gradio clients alive across pipelines and batch iterations, keyed by (space, hf_token).
+    # A client is leased to one stage at a time since some Spaces keep per-session state between calls.
+
+    def __init__(self, max_idle=600, health_check_interval=120):
+        self.max_idle = max_idle
+        self.health_check_interval = health_check_interval
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._idle = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def client(self, space, api_key=None):
+        entry = self._acquire(space, api_key)
+        try:
+            yield entry["client"]
+        except Exception:
+            # Never hand a client that just failed back to another stage
+            with self._lock:
+                self.evictions += 1
+            self._close([entry])
+            raise
+        else:
+            entry["used"] = time.monotonic()
+            with self._lock:
+                self._idle.setdefault((space, api_key), []).append(entry)
+
+    def clear(self):
+        with self._lock:
+            entries = [entry for entries in self._idle.values() for entry in entries]
+            self._idle.clear()
+        self._close(entries)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "size": sum(len(entries) for entries in self._idle.values())
+            }
+
+    def reset_stats(self):
+        with self._lock:
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+
+    def _acquire(self, space, api_key):
+        key = (space, api_key)
+        now = time.monotonic()
+
+        while True:
+            with self._lock:
+                expired = self._evict_idle(now)
+                entries = self._idle.get(key)
+                entry = entries.pop() if entries else None
+            self._close(expired)
+
+            if entry is None:
+                break
+
+            if now - entry["checked"] <= self.health_check_interval or self._is_healthy(entry["client"]):
+                entry["checked"] = now
+                with self._lock:
+                    self.hits += 1
+                return entry
+
+            with self._lock:
+                self.evictions += 1
+            self._close([entry])
+
+        client = self._create(space, api_key)
+        with self._lock:
+            self.misses += 1
+        return {"client": client, "used": now, "checked": now}
+
+    def _create(self, space, api_key):
+        from gradio_client import Client
+        options = artifact_store.client_options()
+        with telemetry.span("client", space=space):
+            return Client(space, hf_token=api_key, **options) if api_key else Client(space, **options)
+
+    def _evict_idle(self, now):
+        # Returns the expired entries, to be closed once the lock is released
+        expired = []
+        for key, entries in list(self._idle.items()):
+            fresh = [entry for entry in entries if now - entry["used"] <= self.max_idle]
+            expired.extend(entry for entry in entries if entry not in fresh)
+            self.evictions += len(entries) - len(fresh)
+            if fresh:
+                self._idle[key] = fresh
+            else:
+                del self._idle[key]
+        return expired
+
+    def _close(self, entries):
+        # Every gradio client runs its own heartbeat thread and executor, dropping it is not enough to stop them
+        for entry in entries:
+            close = getattr(entry["client"], "close", None)
+            if close is None:
+                continue
+            try:
+                close()
+            except Exception as e:
+                print(f"Autosculptor: could not close client: {str(e)}")
+
+    def _is_healthy(self, client):
+        import requests
+        try:
+            response = requests.get(client.src.rstrip("/") + "/config", headers=client.headers, timeout=5)
+            return response.status_code == 200
+        except Exception:
+            return False
+
+client_pool = ClientPool()
@@ -0,0 +1,262 @@
+import os
+from .pipeline import (
+    client_config, configure_spaces, run_staged, fan_out, Cancelled,
+    shap_e_text_to_3d, sdxl_text_to_image, one_2_3_45_preprocess, one_2_3_45_estimate_elevation,
+    shap_e_image_to_3d, dreamgaussian_image_to_3d, instantmesh_preprocess, instantmesh_image_to_3d,
+    triposr_preprocess, triposr_image_to_3d
+)
+from .clients import client_pool
+from .retry import RetryPolicy, retrying_stage
+from .cache import get_result_cache, cached_stage
+from .prompt_enhancer import prompt_enhancer
+from .telemetry import telemetry, timed_stage
+from .estimator import eta_estimator, recorded_stage
+from .artifacts import artifact_store
+
+# Names shown to the user for each entry of client_config
+space_labels = {
+    "shap_e": "hysts/Shap-E",
+    "sdxl": "hysts/SDXL",
+    "one_2_3_45": "One-2-3-45/One-2-3-45",
+    "dreamgaussian": "jiawei011/dreamgaussian",
+    "instantmesh": "TencentARC/InstantMesh",
+    "triposr": "stabilityai/TripoSR"
+}
+
+class PipelineSpec:
+    def __init__(self, model_type, label, stages, estimated_time, post_process=None):
+        self.model_type = model_type
+        self.label = label
+        self.stages = stages
+        self.estimated_time = estimated_time
+        # Default mesh_processing.process options for the models of this pipeline
+        self.post_process = dict(DEFAULT_POST_PROCESS, **(post_process or {}))
+
+    @property
+    def spaces(self):
+        spaces = []
+        for stage in self.stages:
+            if stage.space not in spaces:
+                spaces.append(stage.space)
+        return spaces
+
+    @property
+    def description(self):
+        hosts = " + ".join(space_labels.get(space, client_config[space]) for space in self.spaces)
+        return f"{hosts} (~{self.estimated_time}s)"
+
+DEFAULT_POST_PROCESS = {"weld_distance": 1e-4, "target_faces": 0, "normals": True}
+
+# Pipelines by model type, in the order they are offered in the UI
+registry = {}
+
+def register_pipeline(model_type, label, stages, estimated_time, post_process=None):
+    registry[model_type] = PipelineSpec(model_type, label, stages, estimated_time, post_process)
+    return registry[model_type]
+
+register_pipeline("model-shap-e", "Shap-E", [shap_e_text_to_3d], 13)
+register_pipeline("model-sdxl-shap-e", "SDXL + Shap-E", [sdxl_text_to_image, one_2_3_45_preprocess, shap_e_image_to_3d], 30)
+register_pipeline("model-sdxl-dreamgaussian", "SDXL + DreamGaussian", [sdxl_text_to_image, one_2_3_45_estimate_elevation, dreamgaussian_image_to_3d], 600, {"target_faces": 50000})
+register_pipeline("model-sdxl-instantmesh", "SDXL + InstantMesh", [sdxl_text_to_image, instantmesh_preprocess, instantmesh_image_to_3d], 60, {"target_faces": 50000})
+# TripoSR extracts its marching cubes mesh at a fixed resolution of 320
+register_pipeline("model-sdxl-triposr", "SDXL + TripoSR", [sdxl_text_to_image, triposr_preprocess, triposr_image_to_3d], 30, {"target_faces": 40000})
+
+def model_type_items():
+    return [(spec.model_type, spec.label, spec.description) for spec in registry.values()]
+
+def selected_model_types(settings):
+    # Several model types fan out from one SDXL image, jobs saved before that and single pipeline callers set "model_type"
+    model_types = settings.get("model_types") or settings.get("model_type") or DEFAULT_SETTINGS["model_types"]
+    if isinstance(model_types, str):
+        model_types = [model_types]
+    return [model_type for model_type in registry if model_type in model_types] + [model_type for model_type in model_types if model_type not in registry]
+
+def split_pipelines(model_types):
+    # Returns the leading stages all the pipelines have in common, and the remaining stages of each pipeline
+    pipelines = [registry[model_type].stages for model_type in model_types]
+    shared = []
+    for stages in zip(*pipelines):
+        if any(stage is not stages[0] for stage in stages):
+            break
+        shared.append(stages[0])
+    return shared, {model_type: stages[len(shared):] for model_type, stages in zip(model_types, pipelines)}
+
+DEFAULT_SETTINGS = {
+    "prompt": "",
+    "prompt_enhancer": False,
+    "prompt_enhancer_timeout": 30,
+    "seeds": [0],
+    "guidance_scale": 15,
+    "num_inference_steps": 64,
+    "model_types": ["model-shap-e"],
+    "image_width": 1024,
+    "image_height": 1024,
+    "api_key": "",
+    "use_cache": True,
+    "cache_size": 2048,
+    "max_workers": 1,
+    "max_retries": 2,
+    "max_download_size": 512
+}
+
+class Engine:
+    # Runs generation settings through the registered pipelines. Nothing here imports bpy, so the
+    # engine can be driven from Blender, the batch runner, benchmarks or a plain process pool.
+
+    def __init__(self, cache_dir=None, data_dir=None):
+        self.cache_dir = cache_dir
+        self.data_dir = data_dir
+        if data_dir:
+            telemetry.configure(os.path.join(data_dir, "telemetry.jsonl"))
+            eta_estimator.configure(os.path.join(data_dir, "eta_samples.json"))
+            artifact_store.configure(os.path.join(data_dir, "staging"))
+
+    def enhance_prompt(self, prompt, timeout=30):
+        prompt_enhancer.configure(
+            memo_path=os.path.join(self.data_dir, "prompt_enhancer.json") if self.data_dir else None,
+            read_timeout=timeout
+        )
+        return prompt_enhancer.enhance(prompt)
+
+    def get_cache(self, settings):
+        if not settings["use_cache"] or not self.cache_dir:
+            return None
+        return get_result_cache(self.cache_dir, settings["cache_size"] * 1024 * 1024)
+
+    def build_stages(self, model_type, max_retries=2, cache=None):
+        return self.wrap_stages(registry[model_type].stages, max_retries, cache)
+
+    def wrap_stages(self, stages, max_retries=2, cache=None):
+        # Retry failing stages on their own, upstream outputs stay on the item
+        policy = RetryPolicy(attempts=max_retries + 1)
+        stages = [retrying_stage(recorded_stage(stage, eta_estimator), policy) for stage in stages]
+        if cache:
+            stages = [cached_stage(stage, cache) for stage in stages]
+        return [timed_stage(stage) for stage in stages]
+
+    def build_fan_out(self, model_types, max_retries=2, cache=None, on_branch_progress=None, on_branch_error=None):
+        # Shared stages run once per item, then a single fan-out stage runs the rest of every pipeline side by side
+        shared, branches = split_pipelines(model_types)
+        stages = self.wrap_stages(shared, max_retries, cache)
+        if len(branches) > 1:
+            branches = {model_type: self.wrap_stages(branch, max_retries, cache) for model_type, branch in branches.items()}
+            stages.append(fan_out(branches, on_branch_progress, on_branch_error))
+        return stages
+
+    def make_item(self, settings, prompt, seed, **extra):
+        item = {
+            "prompt": prompt,
+            "seed": seed,
+            "model_type": " + ".join(selected_model_types(settings)),
+            "guidance_scale": settings["guidance_scale"],
+            "num_inference_steps": settings["num_inference_steps"],
+            "image_width": settings["image_width"],
+            "image_height": settings["image_height"],
+            "api_key": settings["api_key"] or None
+        }
+        item.update(extra)
+        return item
+
+    def run(self, job, on_model=None):
+        settings = dict(DEFAULT_SETTINGS, **job.settings)
+        model_types = selected_model_types(job.settings)
+
+        if not model_types or any(model_type not in registry for model_type in model_types):
+            raise ValueError("Invalid model type.")
+
+        shared, branches = split_pipelines(model_types)
+        steps_per_item = len(shared) + sum(len(branch) for branch in branches.values())
+        job.start(len(settings["seeds"]) * steps_per_item)
+
+        prompt = settings["prompt"]
+        if settings["prompt_enhancer"]:
+            job.advance(0, "prompt enhancer", steps=0)
+            prompt = self.enhance_prompt(prompt, settings["prompt_enhancer_timeout"])
+
+        cache = self.get_cache(settings)
+        if cache:
+            cache.reset_stats()
+
+        artifact_store.configure(max_file_size=settings["max_download_size"] * 1024 * 1024)
+        artifact_store.collect_garbage()
+        downloaded = artifact_store.downloaded
+
+        def on_branch_progress(branch, stage):
+            # Branches start from a copy of the item, with the shared stages already counted
+            branch["stages_done"] = branch.get("stages_done", 0) + 1
+            job.advance(branch["stages_done"], stage.__name__)
+
+        def on_branch_error(branch, e, steps_left):
+            job.advance(job.stage, job.stage_name, steps=steps_left)
+            if isinstance(e, Cancelled):
+                return
+            job.failed += 1
+            job.log(f"Generation failed for seed {branch['seed']} with {registry[branch['model_type']].label}: {str(e)}. This could be due to a model hosting issue or an internet connection problem.")
+
+        stages = self.build_fan_out(model_types, settings["max_retries"], cache, on_branch_progress, on_branch_error)
+
+        client_pool.reset_stats()
+
+        items = [
+            self.make_item(
+                settings, prompt, seed,
+                cancel=job.cancel_token,
+                on_status=lambda item, status: job.update_remote(item["seed"], status)
+            )
+            for seed in settings["seeds"]
+        ]
+
+        def on_progress(item, index):
+            job.clear_remote(item["seed"])
+            if index >= len(shared):
+                # The fan-out stage reports its own steps
+                return
+            item["stages_done"] = index + 1
+            job.advance(index + 1, stages[index].__name__)
+            # Show the SDXL image while the 3D reconstruction is still running
+            if stages[index].output == "image_path":
+                job.preview_path = artifact_store.local(item["image_path"], item["api_key"])
+
+        def on_result(item):
+            models = item.get("models", {model_types[0]: item.get("model_path")})
+            for model_type, model_path in models.items():
+                job.completed += 1
+                if on_model:
+                    on_model(model_path, model_type)
+
+        def on_error(item, e):
+            job.clear_remote(item["seed"])
+            # Count the stages this item will never run so the progress still reaches the end
+            job.advance(job.stage, job.stage_name, steps=steps_per_item - item.get("stages_done", 0))
+            if isinstance(e, Cancelled):
+                return
+            # Handle errors in model generation without aborting the rest of the batch
+            job.failed += 1
+            job.log(f"Generation failed for seed {item['seed']}: {str(e)}. This could be due to a model hosting issue or an internet connection problem.")
+
+        # Generate the 3D models as a staged pipeline, with at most max_workers calls per stage to stay under HF rate limits
+        workers = min(settings["max_workers"], len(items))
+        run_staged(stages, items, workers=workers, on_result=on_result, on_error=on_error, on_progress=on_progress)
+
+        stats = client_pool.stats()
+        print(f"Autosculptor client pool: {stats['hits']} hits, {stats['misses']} misses, {stats['evictions']} evictions")
+        print(f"Autosculptor artifacts: {(artifact_store.downloaded - downloaded) / 1024 ** 2:.1f} MB downloaded")
+        if cache:
+            stats = cache.stats()
+            print(f"Autosculptor result cache: {stats['hits']} hits, {stats['misses']} misses")
+        if settings["prompt_enhancer"]:
+            stats = prompt_enhancer.stats()
+            print(f"Autosculptor prompt enhancer: {stats['hit_rate']:.0%} hit rate, {stats['mean_latency']:.2f}s mean latency, {stats['failures']} fallbacks")
+
+    def generate(self, settings):
+        from .jobs import GenerationJob
+        model_paths = []
+        job = GenerationJob(settings)
+        self.run(job, on_model=lambda model_path, model_type: model_paths.append(model_path))
+        return model_paths
+
+def generate(settings, cache_dir=None, data_dir=None, spaces=None):
+    # Module-level entry point so batches can be spread over a concurrent.futures.ProcessPoolExecutor
+    if spaces:
+        configure_spaces(spaces)
+    return Engine(cache_dir, data_dir).generate(settings)
@@ -0,0 +1,139 @@
+import os
+import json
+import math
+import time
+import threading
+from functools import wraps
+
+class EtaEstimator:
+    # Learns how long each pipeline stage takes from the runs that actually completed. Every stage gets
+    # its own least squares fit on inference steps, image resolution, HF token and time of day (as a
+    # point on a circle so 23h and 0h are close), falling back to the mean duration while there are
+    # too few samples, and to the static pipeline estimate before a stage has ever run.
+
+    def __init__(self, path=None, max_samples=200):
+        self.path = path
+        self.max_samples = max_samples
+        self.samples = {}
+        self._models = {}
+        self._lock = threading.Lock()
+
+    def configure(self, path):
+        with self._lock:
+            if path == self.path:
+                return
+            self.path = path
+            self.samples = {}
+            self._models = {}
+            if path and os.path.isfile(path):
+                try:
+                    with open(path, "r", encoding="utf-8") as file:
+                        self.samples = json.load(file)
+                except (OSError, ValueError) as e:
+                    print(f"Autosculptor: could not read ETA samples: {str(e)}")
+
+    def features(self, settings, timestamp=None):
+        now = time.localtime(timestamp)
+        angle = 2 * math.pi * (now.tm_hour + now.tm_min / 60) / 24
+        return [
+            1.0,
+            float(settings.get("num_inference_steps") or 0),
+            (settings.get("image_width") or 0) * (settings.get("image_height") or 0) / 1e6,
+            1.0 if settings.get("api_key") else 0.0,
+            math.sin(angle),
+            math.cos(angle)
+        ]
+
+    def record(self, stage_name, settings, duration):
+        with self._lock:
+            samples = self.samples.setdefault(stage_name, [])
+            samples.append({"x": self.features(settings), "duration": duration})
+            del samples[:-self.max_samples]
+            self._models.pop(stage_name, None)
+            if self.path:
+                self._save()
+
+    def predict_stage(self, stage_name, settings):
+        with self._lock:
+            model = self._models.get(stage_name)
+            if model is None:
+                model = self._models[stage_name] = self._fit(self.samples.get(stage_name, []))
+        if model is None:
+            return None
+
+        coefficients, mean, low, high = model
+        if coefficients is None:
+            return mean
+        value = sum(c * x for c, x in zip(coefficients, self.features(settings)))
+        # Keep extrapolations within reach of what was actually observed
+        return min(max(value, low * 0.5), high * 2)
+
+    def predict(self, specs, settings, batch_count=1, workers=1, live=None):
+        # Returns (seconds, source) for a batch run as a staged pipeline with `workers` items per stage at a time.
+        # Several pipelines run their shared stages once, then their own stages side by side as one fan-out stage.
+        # Stage ETAs currently reported by the Spaces (live) win over learned durations, which win over the static estimate.
+        from .engine import split_pipelines
+
+        live = live or {}
+        sources = set()
+
+        def stage_duration(spec, stage):
+            duration = live.get(stage.__name__)
+            source = "live"
+            if duration is None:
+                duration = self.predict_stage(stage.__name__, settings)
+                source = "learned"
+            if duration is None:
+                duration = spec.estimated_time / len(spec.stages)
+                source = "static"
+            sources.add(source)
+            return duration
+
+        if not specs:
+            return 0, "static"
+        shared, branches = split_pipelines([spec.model_type for spec in specs])
+        durations = [stage_duration(specs[0], stage) for stage in shared]
+        if len(specs) > 1:
+            durations.append(max(sum(stage_duration(spec, stage) for stage in branches[spec.model_type]) for spec in specs))
+
+        if not durations:
+            return 0, "static"
+        # The first item goes through every stage, the others follow at the pace of the slowest stage
+        rounds = math.ceil(batch_count / max(1, min(workers, batch_count)))
+        source = next(source for source in ("live", "learned", "static") if source in sources)
+        return sum(durations) + (rounds - 1) * max(durations), source
+
+    def _fit(self, samples):
+        if not samples:
+            return None
+
+        import numpy as np
+        x = np.array([sample["x"] for sample in samples], dtype=np.float64)
+        y = np.array([sample["duration"] for sample in samples], dtype=np.float64)
+        mean, low, high = float(y.mean()), float(y.min()), float(y.max())
+        if len(samples) < 2 * x.shape[1]:
+            return None, mean, low, high
+
+        coefficients = np.linalg.lstsq(x, y, rcond=None)[0]
+        return coefficients.tolist(), mean, low, high
+
+    def _save(self):
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            with open(self.path + ".tmp", "w", encoding="utf-8") as file:
+                json.dump(self.samples, file)
+            os.replace(self.path + ".tmp", self.path)
+        except OSError as e:
+            print(f"Autosculptor: could not save ETA samples: {str(e)}")
+
+def recorded_stage(stage, estimator):
+    # Records the duration of each successful call, placed under the cache and retries so only real Space calls count
+    @wraps(stage)
+    def wrapper(item):
+        start = time.perf_counter()
+        result = stage(item)
+        estimator.record(stage.__name__, item, time.perf_counter() - start)
+        return result
+    return wrapper
+
+eta_estimator = EtaEstimator()
@@ -0,0 +1,50 @@
+import bpy
+import queue
+import time
+import traceback
+
+class ImportScheduler:
+    # Worker threads push finished models here; a single main-thread timer drains the queue
+    # in order, stopping once a tick has used up its time budget so the viewport stays responsive.
+
+    def __init__(self, budget_ms=20, interval=0.1):
+        self.budget_ms = budget_ms
+        self.interval = interval
+        self._queue = queue.Queue()
+
+    def push(self, callback, *args):
+        self._queue.put((callback, args))
+
+    def pending(self):
+        return self._queue.qsize()
+
+    def tick(self):
+        start = time.perf_counter()
+        while True:
+            try:
+                callback, args = self._queue.get_nowait()
+            except queue.Empty:
+                break
+
+            try:
+                callback(*args)
+            except Exception:
+                traceback.print_exc()
+
+            if (time.perf_counter() - start) * 1000 >= self.budget_ms:
+                # Yield back to the UI, the rest is picked up right after the next redraw
+                return 0.0
+        return self.interval
+
+import_scheduler = ImportScheduler()
+
+def import_timer():
+    return import_scheduler.tick()
+
+def register():
+    if not bpy.app.timers.is_registered(import_timer):
+        bpy.app.timers.register(import_timer, first_interval=import_scheduler.interval, persistent=True)
+
+def unregister():
+    if bpy.app.timers.is_registered(import_timer):
+        bpy.app.timers.unregister(import_timer)
@@ -0,0 +1,222 @@
+import os
+import json
+import time
+import uuid
+import threading
+from .pipeline import CancelToken
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+# Settings that must never be written to disk
+PRIVATE_SETTINGS = ("api_key",)
+
+class GenerationJob:
+    def __init__(self, settings, job_id=None, state=QUEUED, created=None):
+        self.id = job_id or uuid.uuid4().hex[:8]
+        self.settings = settings
+        self.state = state
+        self.created = created or time.time()
+        self.stage = 0
+        self.stage_name = ""
+        self.steps_done = 0
+        self.steps_total = 0
+        self.completed = 0
+        self.failed = 0
+        self.error = ""
+        self.messages = []
+        self.remote = {}
+        self.preview_path = None
+        self.preview_image = None
+        self.cancel_token = CancelToken()
+        self._lock = threading.Lock()
+
+    @property
+    def progress(self):
+        if not self.steps_total:
+            return 0.0
+        return min(self.steps_done / self.steps_total, 1.0)
+
+    def start(self, steps_total):
+        with self._lock:
+            self.steps_total = steps_total
+            self.steps_done = 0
+
+    def advance(self, stage, stage_name, steps=1):
+        with self._lock:
+            self.stage = stage
+            self.stage_name = stage_name
+            self.steps_done += steps
+
+    def update_remote(self, seed, status):
+        with self._lock:
+            self.remote[seed] = status
+
+    def clear_remote(self, seed):
+        with self._lock:
+            self.remote.pop(seed, None)
+
+    def remote_status(self):
+        # Live queue position and ETA of the calls in flight, as reported by the Spaces
+        with self._lock:
+            statuses = list(self.remote.values())
+        ranks = [status["rank"] for status in statuses if status["rank"] is not None]
+        etas = [status["eta"] for status in statuses if status["eta"] is not None]
+        return {
+            "rank": min(ranks) if ranks else None,
+            "eta": max(etas) if etas else None
+        }
+
+    def log(self, message):
+        print(f"Autosculptor [{self.id}]: {message}")
+        with self._lock:
+            self.messages.append(message)
+
+    def status(self):
+        if self.state == RUNNING and self.stage_name:
+            return f"stage {self.stage} ({self.stage_name})"
+        return self.state
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "settings": {name: value for name, value in self.settings.items() if name not in PRIVATE_SETTINGS},
+            "state": self.state,
+            "created": self.created
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data["settings"], job_id=data["id"], state=data["state"], created=data["created"])
+
+class JobManager:
+    # Runs generation jobs one after another on a background thread and keeps unfinished jobs on disk
+
+    def __init__(self, runner=None, path=None, history=20):
+        self.runner = runner
+        self.path = path
+        self.history = history
+        self.jobs = []
+        self._lock = threading.RLock()
+        self._thread = None
+
+    def configure(self, runner=None, path=None):
+        with self._lock:
+            if runner is not None:
+                self.runner = runner
+            if path is not None:
+                self.path = path
+
+    def load(self):
+        # Jobs interrupted by a restart are queued again
+        if not self.path or not os.path.isfile(self.path):
+            return []
+        try:
+            with open(self.path, "r", encoding="utf-8") as file:
+                data = json.load(file)
+        except (OSError, ValueError):
+            return []
+
+        restored = []
+        with self._lock:
+            known = {job.id for job in self.jobs}
+            for entry in data:
+                if entry["id"] in known or entry["state"] not in (QUEUED, RUNNING):
+                    continue
+                job = GenerationJob.from_dict(entry)
+                job.state = QUEUED
+                self.jobs.append(job)
+                restored.append(job)
+        return restored
+
+    def submit(self, job):
+        with self._lock:
+            self.jobs.append(job)
+            self._save()
+            self.start()
+        return job
+
+    def run_now(self, job):
+        with self._lock:
+            self.jobs.append(job)
+        self._run(job)
+        return job
+
+    def start(self):
+        with self._lock:
+            if self._thread is None and any(job.state == QUEUED for job in self.jobs):
+                self._thread = threading.Thread(target=self._work, daemon=True)
+                self._thread.start()
+
+    def cancel(self, job_id):
+        with self._lock:
+            job = self.get(job_id)
+            if job is None or job.state not in (QUEUED, RUNNING):
+                return False
+            if job.state == QUEUED:
+                job.state = CANCELLED
+            self._save()
+        job.cancel_token.cancel()
+        return True
+
+    def get(self, job_id):
+        with self._lock:
+            return next((job for job in self.jobs if job.id == job_id), None)
+
+    def active_job(self):
+        with self._lock:
+            return next((job for job in self.jobs if job.state == RUNNING), None)
+
+    def busy(self):
+        with self._lock:
+            return any(job.state in (QUEUED, RUNNING) for job in self.jobs)
+
+    def _work(self):
+        while True:
+            with self._lock:
+                job = next((job for job in self.jobs if job.state == QUEUED), None)
+                if job is None:
+                    self._thread = None
+                    return
+            self._run(job)
+
+    def _run(self, job):
+        with self._lock:
+            job.state = RUNNING
+            self._save()
+
+        try:
+            self.runner(job)
+        except Exception as e:
+            job.error = str(e)
+
+        with self._lock:
+            if job.cancel_token.cancelled:
+                job.state = CANCELLED
+            elif job.error or (job.failed and not job.completed):
+                job.state = FAILED
+            else:
+                job.state = DONE
+            self._prune()
+            self._save()
+
+    def _prune(self):
+        finished = [job for job in self.jobs if job.state in (DONE, FAILED, CANCELLED)]
+        for job in finished[:-self.history]:
+            self.jobs.remove(job)
+
+    def _save(self):
+        if not self.path:
+            return
+        pending = [job.to_dict() for job in self.jobs if job.state in (QUEUED, RUNNING)]
+        try:
+            with open(self.path + ".tmp", "w", encoding="utf-8") as file:
+                json.dump(pending, file, indent=2)
+            os.replace(self.path + ".tmp", self.path)
+        except OSError:
+            pass
+
+job_manager = JobManager()
@@ -0,0 +1,197 @@
+import bpy
+
+# Generated models share one vertex color material per color layer instead of getting a new
+# material each, so batches do not fill the file with identical "ImportedMaterial.###" copies.
+
+LAYER_TAG = "autosculptor_layer"
+LEGACY_NAME = "ImportedMaterial"
+ATLAS_UV = "Atlas"
+
+material_names = {}
+
+def color_layer_name(mesh):
+    if hasattr(mesh, "color_attributes"):
+        if mesh.color_attributes.active_color_name:
+            return mesh.color_attributes.active_color_name
+        if len(mesh.color_attributes):
+            return mesh.color_attributes[0].name
+    elif mesh.vertex_colors:
+        return mesh.vertex_colors[0].name
+    return "Color"
+
+def material_name(layer_name):
+    return "Autosculptor Vertex Color" if layer_name == "Color" else f"Autosculptor Vertex Color ({layer_name})"
+
+def find_material(layer_name):
+    # Names are cached rather than datablocks, which do not survive undo or reloading the file
+    material = bpy.data.materials.get(material_names.get(layer_name, material_name(layer_name)))
+    if material is None or material.get(LAYER_TAG) != layer_name:
+        material = next((material for material in bpy.data.materials if material.get(LAYER_TAG) == layer_name), None)
+    if material is not None:
+        material_names[layer_name] = material.name
+    return material
+
+def get_vertex_color_material(layer_name="Color"):
+    material = find_material(layer_name)
+    if material is None:
+        material = build_vertex_color_material(material_name(layer_name), layer_name)
+        material_names[layer_name] = material.name
+    return material
+
+def build_vertex_color_material(name, layer_name):
+    material = bpy.data.materials.new(name=name)
+    material.use_nodes = True
+    material[LAYER_TAG] = layer_name
+
+    bsdf = next((node for node in material.node_tree.nodes if isinstance(node, bpy.types.ShaderNodeBsdfPrincipled)), None)
+    if not bsdf:
+        bsdf = material.node_tree.nodes.new(type='ShaderNodeBsdfPrincipled')
+
+    attribute_node = material.node_tree.nodes.new('ShaderNodeVertexColor')
+    attribute_node.layer_name = layer_name
+
+    material.node_tree.links.new(attribute_node.outputs['Color'], bsdf.inputs['Base Color'])
+    return material
+
+def set_material(obj, material):
+    if obj.data.materials:
+        for index in range(len(obj.data.materials)):
+            obj.data.materials[index] = material
+    else:
+        obj.data.materials.append(material)
+
+def assign_material(obj):
+    set_material(obj, get_vertex_color_material(color_layer_name(obj.data)))
+
+def material_signature(material):
+    # Node types, vertex color layers, unlinked input values and links, enough to tell identical copies apart from edited ones
+    if not material.use_nodes or material.node_tree is None:
+        return None
+
+    nodes = []
+    for node in material.node_tree.nodes:
+        inputs = []
+        for socket in node.inputs:
+            if socket.is_linked or not hasattr(socket, "default_value"):
+                continue
+            value = socket.default_value
+            if hasattr(value, "__len__") and not isinstance(value, str):
+                value = tuple(round(component, 4) for component in value)
+            elif isinstance(value, float):
+                value = round(value, 4)
+            inputs.append((socket.identifier, value))
+        nodes.append((node.bl_idname, getattr(node, "layer_name", ""), getattr(node, "image", None) and node.image.name, tuple(inputs)))
+
+    links = [
+        (link.from_node.bl_idname, link.from_socket.identifier, link.to_node.bl_idname, link.to_socket.identifier)
+        for link in material.node_tree.links
+    ]
+    return repr((sorted(nodes, key=repr), sorted(links)))
+
+def deduplicate_materials():
+    # Merges identical copies of the materials created by Autosculptor, returns the number of materials removed
+    candidates = [
+        material for material in bpy.data.materials
+        if material.get(LAYER_TAG) is not None or material.name == LEGACY_NAME or material.name.startswith(LEGACY_NAME + ".")
+    ]
+
+    groups = {}
+    for material in candidates:
+        signature = material_signature(material)
+        if signature is not None:
+            groups.setdefault(signature, []).append(material)
+
+    removed = 0
+    for materials in groups.values():
+        # Keep a tagged material when there is one, so later imports reuse it
+        materials.sort(key=lambda material: material.get(LAYER_TAG) is None)
+        keep = materials[0]
+        for material in materials[1:]:
+            material.user_remap(keep)
+            bpy.data.materials.remove(material)
+            removed += 1
+
+        if keep.get(LAYER_TAG) is None:
+            layers = [node.layer_name for node in keep.node_tree.nodes if isinstance(node, bpy.types.ShaderNodeVertexColor)]
+            if len(layers) == 1 and find_material(layers[0]) is None:
+                keep[LAYER_TAG] = layers[0]
+                keep.name = material_name(layers[0])
+                material_names[layers[0]] = keep.name
+
+    return removed
+
+def bake_vertex_color_atlas(objects, size=2048, name="Autosculptor Atlas"):
+    # Bakes the vertex colors of a batch into one shared image and gives every object the same textured material.
+    # Must run on the main thread, uses Cycles for the bake and restores the render engine and selection afterwards.
+    objects = [obj for obj in objects if obj.type == 'MESH' and obj.data.materials]
+    if not objects:
+        return None
+
+    scene = bpy.context.scene
+    view_layer = bpy.context.view_layer
+    previous_engine = scene.render.engine
+    previous_active = view_layer.objects.active
+    previous_selection = list(bpy.context.selected_objects)
+
+    image = bpy.data.images.new(name, size, size)
+    bake_nodes = []
+    try:
+        for obj in previous_selection:
+            obj.select_set(False)
+        for obj in objects:
+            obj.select_set(True)
+            uv_layer = obj.data.uv_layers.get(ATLAS_UV) or obj.data.uv_layers.new(name=ATLAS_UV)
+            obj.data.uv_layers.active = uv_layer
+        view_layer.objects.active = objects[0]
+
+        # Pack the islands of all objects into the shared UV space
+        bpy.ops.object.mode_set(mode='EDIT')
+        bpy.ops.mesh.select_all(action='SELECT')
+        bpy.ops.uv.lightmap_pack(PREF_CONTEXT='ALL_FACES', PREF_PACK_IN_ONE=True, PREF_NEW_UVLAYER=False, PREF_MARGIN_DIV=0.2)
+        bpy.ops.object.mode_set(mode='OBJECT')
+
+        # The bake writes into the active image node of each material
+        materials = {material for obj in objects for material in obj.data.materials if material}
+        for material in materials:
+            node = material.node_tree.nodes.new('ShaderNodeTexImage')
+            node.image = image
+            material.node_tree.nodes.active = node
+            bake_nodes.append((material, node))
+
+        scene.render.engine = 'CYCLES'
+        bpy.ops.object.bake(type='DIFFUSE', pass_filter={'COLOR'}, margin=4, use_clear=True)
+        image.pack()
+
+        atlas = build_atlas_material(name, image)
+        for obj in objects:
+            set_material(obj, atlas)
+        return atlas
+    finally:
+        for material, node in bake_nodes:
+            material.node_tree.nodes.remove(node)
+        if bpy.context.object and bpy.context.object.mode != 'OBJECT':
+            bpy.ops.object.mode_set(mode='OBJECT')
+        scene.render.engine = previous_engine
+        for obj in objects:
+            obj.select_set(False)
+        for obj in previous_selection:
+            obj.select_set(True)
+        view_layer.objects.active = previous_active
+
+def build_atlas_material(name, image):
+    material = bpy.data.materials.new(name=name)
+    material.use_nodes = True
+    nodes = material.node_tree.nodes
+
+    bsdf = next((node for node in nodes if isinstance(node, bpy.types.ShaderNodeBsdfPrincipled)), None)
+    if not bsdf:
+        bsdf = nodes.new(type='ShaderNodeBsdfPrincipled')
+
+    uv_node = nodes.new('ShaderNodeUVMap')
+    uv_node.uv_map = ATLAS_UV
+    image_node = nodes.new('ShaderNodeTexImage')
+    image_node.image = image
+
+    material.node_tree.links.new(uv_node.outputs['UV'], image_node.inputs['Vector'])
+    material.node_tree.links.new(image_node.outputs['Color'], bsdf.inputs['Base Color'])
+    return material
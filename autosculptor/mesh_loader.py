@@ -0,0 +1,217 @@
+import os
+import json
+import struct
+import bpy
+import numpy as np
+
+GLB_MAGIC = 0x46546C67
+CHUNK_JSON = 0x4E4F534A
+CHUNK_BIN = 0x004E4942
+
+COMPONENT_DTYPES = {
+    5120: np.dtype(np.int8),
+    5121: np.dtype(np.uint8),
+    5122: np.dtype(np.int16),
+    5123: np.dtype(np.uint16),
+    5125: np.dtype(np.uint32),
+    5126: np.dtype(np.float32)
+}
+TYPE_SIZES = {"SCALAR": 1, "VEC2": 2, "VEC3": 3, "VEC4": 4, "MAT4": 16}
+
+class UnsupportedModel(Exception):
+    # Raised for anything the fast path does not handle, callers fall back to bpy.ops.import_scene.gltf
+    pass
+
+def read_glb(path):
+    with open(path, "rb") as file:
+        data = file.read()
+
+    if len(data) < 12:
+        raise UnsupportedModel("File is too small to be a GLB")
+    magic, version, length = struct.unpack_from("<III", data, 0)
+    if magic != GLB_MAGIC or version != 2:
+        raise UnsupportedModel("Not a glTF 2.0 binary file")
+
+    gltf = None
+    binary = None
+    offset = 12
+    while offset + 8 <= length:
+        chunk_length, chunk_type = struct.unpack_from("<II", data, offset)
+        start = offset + 8
+        if chunk_type == CHUNK_JSON:
+            gltf = json.loads(data[start:start + chunk_length])
+        elif chunk_type == CHUNK_BIN and binary is None:
+            binary = memoryview(data)[start:start + chunk_length]
+        offset = start + chunk_length
+
+    if gltf is None or binary is None:
+        raise UnsupportedModel("GLB is missing its JSON or binary chunk")
+    return gltf, binary
+
+def read_accessor(gltf, binary, index):
+    accessor = gltf["accessors"][index]
+    if "sparse" in accessor or "bufferView" not in accessor:
+        raise UnsupportedModel("Sparse accessors are not supported")
+
+    view = gltf["bufferViews"][accessor["bufferView"]]
+    if view.get("buffer", 0) != 0 or "uri" in gltf["buffers"][0]:
+        raise UnsupportedModel("Only the embedded GLB buffer is supported")
+
+    dtype = COMPONENT_DTYPES[accessor["componentType"]]
+    components = TYPE_SIZES[accessor["type"]]
+    count = accessor["count"]
+    offset = view.get("byteOffset", 0) + accessor.get("byteOffset", 0)
+    stride = view.get("byteStride", dtype.itemsize * components)
+
+    # Views over the binary chunk, nothing is copied until the data is converted for Blender
+    if stride == dtype.itemsize * components:
+        array = np.frombuffer(binary, dtype=dtype, count=count * components, offset=offset).reshape(count, components)
+    else:
+        array = np.ndarray((count, components), dtype=dtype, buffer=binary, offset=offset, strides=(stride, dtype.itemsize))
+
+    if accessor.get("normalized"):
+        array = array.astype(np.float32) / np.iinfo(dtype).max
+    return array
+
+def node_matrix(node):
+    if "matrix" in node:
+        return np.array(node["matrix"], dtype=np.float64).reshape(4, 4).T
+
+    x, y, z, w = node.get("rotation", (0.0, 0.0, 0.0, 1.0))
+    rotation = np.array([
+        [1 - 2 * (y * y + z * z), 2 * (x * y - z * w), 2 * (x * z + y * w)],
+        [2 * (x * y + z * w), 1 - 2 * (x * x + z * z), 2 * (y * z - x * w)],
+        [2 * (x * z - y * w), 2 * (y * z + x * w), 1 - 2 * (x * x + y * y)]
+    ])
+    matrix = np.identity(4)
+    matrix[:3, :3] = rotation * np.array(node.get("scale", (1.0, 1.0, 1.0)))
+    matrix[:3, 3] = node.get("translation", (0.0, 0.0, 0.0))
+    return matrix
+
+def world_matrix(gltf, node_index):
+    parents = {}
+    for index, node in enumerate(gltf.get("nodes", [])):
+        for child in node.get("children", []):
+            parents[child] = index
+
+    matrix = np.identity(4)
+    while node_index is not None:
+        matrix = node_matrix(gltf["nodes"][node_index]) @ matrix
+        node_index = parents.get(node_index)
+    return matrix
+
+def linear_to_srgb(colors):
+    return np.where(colors <= 0.0031308, colors * 12.92, 1.055 * np.power(np.clip(colors, 0.0031308, None), 1 / 2.4) - 0.055)
+
+def parse_glb(path):
+    # Returns positions (N, 3) in Blender space, triangle indices (M * 3,), RGBA colors (N, 4) or None, and smooth flag
+    try:
+        return read_mesh(path)
+    except (KeyError, IndexError, ValueError, struct.error) as e:
+        # Missing attributes, unknown accessor types or truncated chunks, left to the glTF importer
+        raise UnsupportedModel(f"Malformed GLB: {type(e).__name__}: {str(e)}") from e
+
+def read_mesh(path):
+    gltf, binary = read_glb(path)
+
+    if gltf.get("extensionsRequired"):
+        raise UnsupportedModel("Required glTF extensions are not supported")
+
+    mesh_nodes = [index for index, node in enumerate(gltf.get("nodes", [])) if "mesh" in node]
+    if len(mesh_nodes) != 1 or len(gltf.get("meshes", [])) != 1:
+        raise UnsupportedModel("Only files with a single mesh are supported")
+
+    primitives = gltf["meshes"][0]["primitives"]
+    if len(primitives) != 1 or primitives[0].get("mode", 4) != 4 or primitives[0].get("targets"):
+        raise UnsupportedModel("Only a single triangle primitive is supported")
+    primitive = primitives[0]
+
+    if "material" in primitive:
+        material = gltf["materials"][primitive["material"]]
+        if "baseColorTexture" in material.get("pbrMetallicRoughness", {}):
+            raise UnsupportedModel("Textured materials are not supported")
+
+    attributes = primitive["attributes"]
+    positions = read_accessor(gltf, binary, attributes["POSITION"]).astype(np.float64)
+    if "indices" in primitive:
+        indices = read_accessor(gltf, binary, primitive["indices"]).ravel().astype(np.int32)
+    else:
+        indices = np.arange(len(positions), dtype=np.int32)
+
+    matrix = world_matrix(gltf, mesh_nodes[0])
+    positions = positions @ matrix[:3, :3].T + matrix[:3, 3]
+    # glTF is Y-up, Blender is Z-up
+    positions = np.stack((positions[:, 0], -positions[:, 2], positions[:, 1]), axis=1).astype(np.float32)
+
+    colors = None
+    if "COLOR_0" in attributes:
+        colors = read_accessor(gltf, binary, attributes["COLOR_0"]).astype(np.float32)
+        if colors.shape[1] == 3:
+            colors = np.hstack((colors, np.ones((len(colors), 1), dtype=np.float32)))
+
+    return positions, indices, colors, "NORMAL" in attributes
+
+def build_mesh(name, positions, indices, colors=None, smooth=False, normals=None):
+    loop_count = len(indices)
+    face_count = loop_count // 3
+
+    mesh = bpy.data.meshes.new(name)
+    mesh.vertices.add(len(positions))
+    mesh.vertices.foreach_set("co", positions.ravel())
+    mesh.loops.add(loop_count)
+    mesh.loops.foreach_set("vertex_index", indices)
+    mesh.polygons.add(face_count)
+    mesh.polygons.foreach_set("loop_start", np.arange(0, loop_count, 3, dtype=np.int32))
+    try:
+        mesh.polygons.foreach_set("loop_total", np.full(face_count, 3, dtype=np.int32))
+    except (AttributeError, TypeError):
+        # Read-only in recent Blender versions, where it is derived from loop_start
+        pass
+    if smooth or normals is not None:
+        mesh.polygons.foreach_set("use_smooth", np.ones(face_count, dtype=bool))
+
+    if colors is not None:
+        if hasattr(mesh, "color_attributes"):
+            attribute = mesh.color_attributes.new("Color", 'FLOAT_COLOR', 'POINT')
+            attribute.data.foreach_set("color", colors.ravel())
+        else:
+            # Byte vertex colors are stored in sRGB and per face corner
+            layer = mesh.vertex_colors.new(name="Color")
+            srgb = colors.copy()
+            srgb[:, :3] = linear_to_srgb(srgb[:, :3])
+            layer.data.foreach_set("color", srgb[indices].ravel())
+
+    mesh.update()
+    mesh.validate()
+
+    if normals is not None:
+        if hasattr(mesh, "use_auto_smooth"):
+            # Custom normals are ignored without auto smooth before Blender 4.1
+            mesh.use_auto_smooth = True
+        mesh.normals_split_custom_set_from_vertices(normals)
+    return mesh
+
+def load_glb(filepath, collection=None):
+    if os.path.splitext(filepath)[1].lower() != ".glb":
+        raise UnsupportedModel("Only .glb files are supported")
+
+    positions, indices, colors, smooth = parse_glb(filepath)
+    return load_arrays(model_name(filepath), positions, indices, colors, smooth, collection=collection)
+
+def model_name(filepath):
+    return os.path.splitext(os.path.basename(filepath))[0]
+
+def load_arrays(name, positions, indices, colors=None, smooth=False, normals=None, collection=None):
+    # Only this bulk write needs the main thread, the arrays can be prepared anywhere
+    mesh = build_mesh(name, positions, indices, colors, smooth, normals)
+
+    obj = bpy.data.objects.new(name, mesh)
+    collection = collection or bpy.context.collection
+    collection.objects.link(obj)
+
+    # Match the selection state left by the glTF importer
+    for selected in bpy.context.selected_objects:
+        selected.select_set(False)
+    obj.select_set(True)
+    bpy.context.view_layer.objects.active = obj
+    return obj
@@ -0,0 +1,114 @@
+import time
+import numpy as np
+
+# Vectorized clean-up of generated meshes. Everything here works on the arrays returned by
+# mesh_loader.parse_glb and never touches bpy, so it can run on the generation worker threads.
+
+def weld(positions, indices, colors=None, distance=1e-4):
+    # Merges vertices closer than `distance` by snapping them to a grid, colors are averaged
+    keys = np.floor(positions / distance).astype(np.int64)
+    _, inverse = np.unique(keys, axis=0, return_inverse=True)
+    inverse = inverse.ravel()
+    positions, colors = merge(positions, colors, inverse)
+    return compact(positions, clean_faces(inverse[indices]), colors)
+
+def merge(positions, colors, inverse):
+    # Mean position and color of the vertices sharing the same index in `inverse`
+    counts = np.bincount(inverse)[:, None]
+    positions = np.stack([np.bincount(inverse, weights=positions[:, axis]) for axis in range(3)], axis=1) / counts
+    if colors is not None:
+        colors = np.stack([np.bincount(inverse, weights=colors[:, channel]) for channel in range(colors.shape[1])], axis=1) / counts
+        colors = colors.astype(np.float32)
+    return positions.astype(np.float32), colors
+
+def clean_faces(indices):
+    # Drops collapsed triangles and triangles repeated with the same three vertices, keeping the winding of the first
+    faces = indices.reshape(-1, 3)
+    faces = faces[(faces[:, 0] != faces[:, 1]) & (faces[:, 1] != faces[:, 2]) & (faces[:, 0] != faces[:, 2])]
+    _, unique = np.unique(np.sort(faces, axis=1), axis=0, return_index=True)
+    return faces[np.sort(unique)].ravel().astype(np.int32)
+
+def compact(positions, indices, colors=None):
+    # Removes the vertices no triangle uses anymore
+    used, inverse = np.unique(indices, return_inverse=True)
+    positions = positions[used]
+    if colors is not None:
+        colors = colors[used]
+    return positions, inverse.ravel().astype(np.int32), colors
+
+def cluster(positions, indices, colors, resolution):
+    # Vertex clustering: every vertex in a cell of a resolution^3 grid over the bounding box becomes their mean
+    low = positions.min(axis=0)
+    size = np.maximum(positions.max(axis=0) - low, 1e-9)
+    cells = np.minimum(((positions - low) / size * resolution).astype(np.int64), resolution - 1)
+    keys = cells[:, 0] + resolution * (cells[:, 1] + resolution * cells[:, 2])
+    _, inverse = np.unique(keys, return_inverse=True)
+    inverse = inverse.ravel()
+    merged, colors = merge(positions, colors, inverse)
+    return merged, clean_faces(inverse[indices]), colors
+
+def decimate(positions, indices, colors=None, target_faces=50000):
+    # Picks the finest clustering grid that stays under target_faces, with a binary search over its resolution
+    if len(indices) // 3 <= target_faces:
+        return positions, indices, colors
+
+    best = None
+    low, high = 2, 2048
+    while low <= high:
+        resolution = (low + high) // 2
+        result = cluster(positions, indices, colors, resolution)
+        if len(result[1]) // 3 <= target_faces:
+            best = result
+            low = resolution + 1
+        else:
+            high = resolution - 1
+
+    if best is None:
+        return positions, indices, colors
+    return compact(*best)
+
+def vertex_normals(positions, indices):
+    # Area weighted average of the normals of the faces around each vertex
+    faces = indices.reshape(-1, 3)
+    corners = positions[faces].astype(np.float64)
+    face_normals = np.cross(corners[:, 1] - corners[:, 0], corners[:, 2] - corners[:, 0])
+
+    normals = np.zeros((len(positions), 3), dtype=np.float64)
+    for corner in range(3):
+        for axis in range(3):
+            normals[:, axis] += np.bincount(faces[:, corner], weights=face_normals[:, axis], minlength=len(positions))
+
+    lengths = np.linalg.norm(normals, axis=1, keepdims=True)
+    lengths[lengths == 0] = 1
+    return (normals / lengths).astype(np.float32)
+
+def process(positions, indices, colors=None, weld_distance=1e-4, target_faces=0, normals=True):
+    # Returns the processed arrays, the vertex normals (or None) and a before/after report
+    report = {
+        "vertices_before": len(positions),
+        "faces_before": len(indices) // 3
+    }
+    start = time.perf_counter()
+
+    if weld_distance:
+        positions, indices, colors = weld(positions, indices, colors, weld_distance)
+    report["weld_time"] = time.perf_counter() - start
+
+    if target_faces:
+        positions, indices, colors = decimate(positions, indices, colors, target_faces)
+    report["decimate_time"] = time.perf_counter() - start - report["weld_time"]
+
+    vertex_normal = vertex_normals(positions, indices) if normals else None
+
+    report.update({
+        "vertices_after": len(positions),
+        "faces_after": len(indices) // 3,
+        "time": time.perf_counter() - start
+    })
+    return positions, indices, colors, vertex_normal, report
+
+def format_report(name, report):
+    return (
+        f"{name}: {report['faces_before']} -> {report['faces_after']} faces, "
+        f"{report['vertices_before']} -> {report['vertices_after']} vertices in {report['time']:.2f}s"
+    )
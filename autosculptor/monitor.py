@@ -0,0 +1,89 @@
+import time
+import threading
+
+class RemoteJobMonitor:
+    # One thread polls the status of every gradio job in flight (queue rank, ETA, progress),
+    # while the stage workers simply wait on their results.
+
+    def __init__(self, interval=0.5):
+        self.interval = interval
+        self.stage_eta = {}
+        self._watched = {}
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def watch(self, job, item):
+        with self._lock:
+            self._watched[job] = {"item": item, "stage": item.get("stage", ""), "submitted": time.monotonic(), "started": None}
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, daemon=True)
+                self._thread.start()
+
+    def unwatch(self, job):
+        # Returns the watch entry, "started" is when the Space was first seen processing the job
+        with self._lock:
+            entry = self._watched.pop(job, None)
+            if entry and not any(other["stage"] == entry["stage"] for other in self._watched.values()):
+                # Live ETAs only describe jobs in flight, the estimator goes back to its learned durations
+                self.stage_eta.pop(entry["stage"], None)
+            return entry
+
+    def watched(self):
+        with self._lock:
+            return len(self._watched)
+
+    def _run(self):
+        while True:
+            with self._lock:
+                if not self._watched:
+                    self._thread = None
+                    return
+                watched = list(self._watched.items())
+
+            for job, entry in watched:
+                try:
+                    update = job.status()
+                except Exception:
+                    continue
+
+                code = getattr(update.code, "name", str(update.code))
+                if code == "PROCESSING" and entry["started"] is None:
+                    entry["started"] = time.monotonic()
+
+                status = {
+                    "stage": entry["stage"],
+                    "code": code,
+                    "rank": update.rank,
+                    "queue_size": update.queue_size,
+                    "eta": update.eta,
+                    "progress": self._progress(update),
+                    "elapsed": time.monotonic() - entry["submitted"]
+                }
+                if update.eta is not None and entry["stage"]:
+                    with self._lock:
+                        # Remember how long the Space expects this stage to take on top of the time already waited
+                        if job in self._watched:
+                            self.stage_eta[entry["stage"]] = status["elapsed"] + update.eta
+
+                callback = entry["item"].get("on_status")
+                if callback:
+                    try:
+                        callback(entry["item"], status)
+                    except Exception:
+                        pass
+
+            time.sleep(self.interval)
+
+    def _progress(self, update):
+        # Spaces reporting gr.Progress send (index, length) pairs
+        progress_data = getattr(update, "progress_data", None)
+        if not progress_data:
+            return None
+        unit = progress_data[-1]
+        if getattr(unit, "progress", None) is not None:
+            return unit.progress
+        if getattr(unit, "index", None) is not None and getattr(unit, "length", None):
+            return unit.index / unit.length
+        return None
+
+remote_monitor = RemoteJobMonitor()
@@ -1,20 +1,16 @@
 import bpy
+import os
 import sys
 import subprocess
-import threading
 import random
+import traceback
 from bpy.types import Operator
-from .utils import ensure_gradio_installed, install_gradio
-
-# Clients API config
-client_config = {
-    "shap_e": "hysts/Shap-E",
-    "sdxl": "hysts/SDXL",
-    "one_2_3_45": "https://one-2-3-45-one-2-3-45.hf.space/",
-    "dreamgaussian": "https://jiawei011-dreamgaussian.hf.space/",
-    "instantmesh": "TencentARC/InstantMesh",
-    "triposr": "stabilityai/TripoSR"
-}
+from .utils import ensure_gradio_installed, install_gradio, warm_imports, get_cache_dir, get_data_dir
+from .importer import import_scheduler
+from .engine import Engine, registry, selected_model_types
+from .jobs import GenerationJob, job_manager
+from .telemetry import telemetry
+from .materials import assign_material, deduplicate_materials, bake_vertex_color_atlas
 
 class InstallDependenciesOperator(Operator):
     bl_idname = "wm.install_dependencies"
@@ -22,7 +18,8 @@ class InstallDependenciesOperator(Operator):
     
     def execute(self, context):
         install_gradio()
-        self.report({'INFO'}, "Dependencies installed successfully. Please restart Blender.")
+        warm_imports()
+        self.report({'INFO'}, "Dependencies installed successfully.")
         return {'FINISHED'}
 
 class GeneratorOperator(Operator):
@@ -30,83 +27,261 @@ class GeneratorOperator(Operator):
     bl_label = "Generate 3D Model"
     bl_description = "Generate a 3D model based on the provided prompt and settings"
     bl_options = {'REGISTER', 'UNDO'}
-    
-    generating = False
 
     def execute(self, context):
-        if GeneratorOperator.generating:
-            self.report({'WARNING'}, "A model is already being generated.")
-            return {'CANCELLED'}
-
         if not ensure_gradio_installed():
             self.report({'ERROR'}, "gradio_client is not installed.")
             return {'CANCELLED'}
 
         autosculptor_props = context.scene.autosculptor_props
 
-        if autosculptor_props.run_in_thread:
-            thread = threading.Thread(target=self.run_pipeline, args=(autosculptor_props,))
-            thread.start()
-            GeneratorOperator.generating = True
-            bpy.context.window_manager.progress_begin(0, 100)
-            bpy.app.timers.register(self.check_thread, first_interval=0.1)
+        if not autosculptor_props.model_types or any(model_type not in registry for model_type in autosculptor_props.model_types):
+            self.report({'ERROR'}, "Invalid model type.")
+            return {'CANCELLED'}
+
+        job = GenerationJob(job_settings(autosculptor_props))
+        configure_job_manager()
+
+        if job_manager.busy():
+            self.report({'INFO'}, "Generation queued.")
+
+        if autosculptor_props.run_in_thread or job_manager.busy():
+            job_manager.submit(job)
+            start_job_monitor()
         else:
-            self.run_pipeline(autosculptor_props)
+            job_manager.run_now(job)
+            if job.error or job.messages:
+                self.report({'ERROR'}, job.error or job.messages[-1])
 
         return {'FINISHED'}
 
-    def check_thread(self):
-        if not GeneratorOperator.generating:
-            bpy.context.window_manager.progress_end()
-            for area in bpy.context.screen.areas:
-                if area.type == 'VIEW_3D':
-                    area.tag_redraw()
-            return None
-        return 0.1
-
-    def run_pipeline(self, autosculptor_props):
-        # Get properties from user input
-        prompt = autosculptor_props.prompt
-        if autosculptor_props.prompt_enhancer:
-            prompt = self.enhance_prompt(prompt)
-        guidance_scale = autosculptor_props.guidance_scale
-        num_inference_steps = autosculptor_props.num_inference_steps
-        model_type = autosculptor_props.model_type
-        batch_count = autosculptor_props.batch_count
-        image_width = autosculptor_props.image_width
-        image_height = autosculptor_props.image_height
-        api_key = autosculptor_props.api_key
-
-        if api_key == "":
-            api_key = None
-
-        for _ in range(batch_count):
-            # Get seed for generation
-            seed = autosculptor_props.seed
-            if autosculptor_props.random_seed:
-                seed = random.randint(0, 2147483647)
-
-            # Generate the 3D model
-            model_path = self.generate_model(prompt, seed, guidance_scale, num_inference_steps, model_type, image_width, image_height, api_key)
-            
-            # Handle errors in model generation
-            if not model_path:
-                self.report({'ERROR'}, "Invalid model type.")
-                GeneratorOperator.generating = False
-                return
-
-            bpy.app.timers.register(lambda: self.import_generated_model(model_path, autosculptor_props.apply_material), first_interval=0.1)
-
-        GeneratorOperator.generating = False
-
-    def import_generated_model(self, model_path, apply_material):
+class CancelJobOperator(Operator):
+    bl_idname = "object.autosculptor_cancel_job"
+    bl_label = "Cancel Generation"
+    bl_description = "Cancel a queued or running generation"
+
+    job_id: bpy.props.StringProperty()
+
+    def execute(self, context):
+        if not job_manager.cancel(self.job_id):
+            self.report({'WARNING'}, "This generation is no longer running.")
+            return {'CANCELLED'}
+        return {'FINISHED'}
+
+class DeduplicateMaterialsOperator(Operator):
+    bl_idname = "object.autosculptor_deduplicate_materials"
+    bl_label = "Merge Duplicate Materials"
+    bl_description = "Replace identical copies of the generated model materials with a single shared material"
+    bl_options = {'REGISTER', 'UNDO'}
+
+    def execute(self, context):
+        removed = deduplicate_materials()
+        self.report({'INFO'}, f"Removed {removed} duplicate materials.")
+        return {'FINISHED'}
+
+def job_settings(autosculptor_props):
+    # Get seeds for generation
+    seeds = []
+    for _ in range(autosculptor_props.batch_count):
+        seed = autosculptor_props.seed
+        if autosculptor_props.random_seed:
+            seed = random.randint(0, 2147483647)
+        seeds.append(seed)
+
+    return {
+        "prompt": autosculptor_props.prompt,
+        "prompt_enhancer": autosculptor_props.prompt_enhancer,
+        "prompt_enhancer_timeout": autosculptor_props.prompt_enhancer_timeout,
+        "seeds": seeds,
+        "guidance_scale": autosculptor_props.guidance_scale,
+        "num_inference_steps": autosculptor_props.num_inference_steps,
+        "model_types": [model_type for model_type in registry if model_type in autosculptor_props.model_types],
+        "image_width": autosculptor_props.image_width,
+        "image_height": autosculptor_props.image_height,
+        "api_key": autosculptor_props.api_key,
+        "apply_material": autosculptor_props.apply_material,
+        "bake_atlas": autosculptor_props.bake_atlas,
+        "atlas_size": autosculptor_props.atlas_size,
+        "fast_import": autosculptor_props.fast_import,
+        "post_process": autosculptor_props.post_process,
+        "target_faces": autosculptor_props.target_faces,
+        "import_budget_ms": autosculptor_props.import_budget_ms,
+        "use_cache": autosculptor_props.use_cache,
+        "cache_size": autosculptor_props.cache_size,
+        "max_workers": autosculptor_props.max_workers,
+        "max_retries": autosculptor_props.max_retries,
+        "max_download_size": autosculptor_props.max_download_size,
+        "profile_import": autosculptor_props.profile_import
+    }
+
+def configure_job_manager():
+    job_manager.configure(runner=run_generation_job, path=os.path.join(get_data_dir(), "jobs.json"))
+
+def restore_jobs(api_key=""):
+    # Jobs left unfinished by a previous session are run again, the HF token is never stored on disk
+    configure_job_manager()
+    restored = job_manager.load()
+    for job in restored:
+        job.settings["api_key"] = api_key
+    if restored:
+        job_manager.start()
+        start_job_monitor()
+    return restored
+
+job_monitor_running = False
+
+def start_job_monitor():
+    global job_monitor_running
+    if job_monitor_running:
+        return
+    job_monitor_running = True
+    bpy.context.window_manager.progress_begin(0, 100)
+    bpy.app.timers.register(monitor_jobs, first_interval=0.1)
+
+def monitor_jobs():
+    global job_monitor_running
+    window_manager = bpy.context.window_manager
+    for window in window_manager.windows:
+        for area in window.screen.areas:
+            if area.type == 'VIEW_3D':
+                area.tag_redraw()
+
+    # Follow the ETAs reported by the Spaces
+    if bpy.context.scene:
+        bpy.context.scene.autosculptor_props.update_estimated_time(bpy.context)
+
+    job = job_manager.active_job()
+    if job is None and not job_manager.busy():
+        window_manager.progress_end()
+        job_monitor_running = False
+        return None
+
+    if job is not None:
+        window_manager.progress_update(int(job.progress * 100))
+        load_preview(job)
+    return 0.1
+
+def load_preview(job):
+    # Images can only be loaded from the main thread
+    if job.preview_path and job.preview_image is None:
+        try:
+            job.preview_image = bpy.data.images.load(job.preview_path, check_existing=True).name
+        except RuntimeError:
+            job.preview_image = ""
+
+# Distance along X between the models of different backends in fan-out generations
+COMPARE_SPACING = 2.0
+
+def get_engine():
+    return Engine(cache_dir=get_cache_dir(), data_dir=get_data_dir())
+
+def run_generation_job(job):
+    import_scheduler.budget_ms = job.settings.get("import_budget_ms", import_scheduler.budget_ms)
+    apply_material = job.settings.get("apply_material", True)
+    fast_import = job.settings.get("fast_import", True)
+    model_types = selected_model_types(job.settings)
+    profile = job.settings.get("profile_import", False)
+
+    imported = []
+
+    def import_model_later(model_path, model_type, prepared):
+        obj = import_generated_model(model_path, apply_material, fast_import, model_type, profile, prepared)
+        if obj is None:
+            return
+        imported.append(obj.name)
+        if len(model_types) > 1:
+            # Models of the same image from different backends are lined up side by side for comparison
+            obj.location.x += model_types.index(model_type) * COMPARE_SPACING
+            obj.name = f"{registry[model_type].label} {obj.name}"
+
+    def on_model(model_path, model_type):
+        prepared = None
+        if job.settings.get("post_process") and fast_import and model_type in registry:
+            # Per-model preset, with the face budget overridden by the user when set
+            options = dict(registry[model_type].post_process)
+            if job.settings.get("target_faces"):
+                options["target_faces"] = job.settings["target_faces"]
+            prepared = prepare_model(model_path, options, model_type)
+        # Hand the finished model to the main thread for import
+        import_scheduler.push(import_model_later, model_path, model_type, prepared)
+
+    get_engine().run(job, on_model=on_model)
+
+    if apply_material and job.settings.get("bake_atlas") and len(job.settings["seeds"]) * len(model_types) > 1:
+        # Queued behind the imports of this job, so every model is in the scene by the time it runs
+        import_scheduler.push(bake_atlas, imported, job.settings.get("atlas_size", 2048))
+
+def bake_atlas(object_names, size):
+    objects = [bpy.data.objects[name] for name in object_names if name in bpy.data.objects]
+    if len(objects) < 2:
+        return
+    try:
+        with telemetry.span("bake_atlas", objects=len(objects), size=size):
+            bake_vertex_color_atlas(objects, size)
+    except RuntimeError as e:
+        print(f"Autosculptor: could not bake the texture atlas: {str(e)}")
+
+def prepare_model(model_path, options, model_type=""):
+    # Runs on the generation worker thread, the main thread only has to write the cleaned up arrays
+    from .mesh_loader import parse_glb, model_name, UnsupportedModel
+    from .mesh_processing import process, format_report
+
+    name = model_name(model_path)
+    try:
+        if not model_path.lower().endswith(".glb"):
+            raise UnsupportedModel("Only .glb files are supported")
+        positions, indices, colors, smooth = parse_glb(model_path)
+
+        with telemetry.span("post_process", model_type=model_type) as fields:
+            positions, indices, colors, normals, report = process(positions, indices, colors, **options)
+            fields.update(report)
+    except UnsupportedModel as e:
+        print(f"Autosculptor: {name} is imported without post-processing ({str(e)})")
+        return None
+    except Exception:
+        # Anything raised here would fail the last pipeline stage, the plain import still gets the model in
+        print(f"Autosculptor: post-processing {name} failed, importing it as is")
+        traceback.print_exc()
+        return None
+
+    print(f"Autosculptor: post-processed {format_report(name, report)}")
+
+    return {"name": name, "positions": positions, "indices": indices, "colors": colors, "smooth": smooth, "normals": normals}
+
+def import_generated_model(model_path, apply_material, fast_import=True, model_type="", profile=False, prepared=None):
+    with telemetry.profile("import", os.path.join(get_data_dir(), "profiles"), enabled=profile):
+        with telemetry.span("import", model_type=model_type, fast_import=fast_import):
+            if prepared:
+                from .mesh_loader import load_arrays
+                obj = load_arrays(**prepared)
+            else:
+                obj = import_model(model_path, fast_import)
+
+        # Assign material to the imported object
+        if obj is not None and apply_material:
+            with telemetry.span("material", model_type=model_type):
+                assign_material(obj)
+    return obj
+
+def import_model(model_path, fast_import):
+    from .mesh_loader import load_glb, UnsupportedModel
+
+    obj = None
+    if fast_import:
+        # Build the mesh straight from the GLB buffers, anything unusual goes through the glTF importer
+        try:
+            obj = load_glb(model_path)
+        except UnsupportedModel:
+            obj = None
+
+    if obj is None:
         # Import the generated model into Blender
         bpy.ops.import_scene.gltf(filepath=model_path)
         
         # Check if any object was imported
         if not bpy.context.selected_objects:
-            self.report({'ERROR'}, "No object was imported.")
-            return
+            print("Autosculptor: No object was imported.")
+            return None
 
         # Get the imported object
         parent_obj = bpy.context.selected_objects[0]
@@ -114,211 +289,7 @@ class GeneratorOperator(Operator):
         
         # Handle errors in finding a mesh object
         if obj is None:
-            self.report({'ERROR'}, "No mesh object found among imported children.")
-            return
-        
-        # Assign material to the imported object
-        if apply_material:
-            self.assign_material(obj)
-
-    def enhance_prompt(self, prompt):
-        import requests
-        response = requests.post(
-            "https://gustavosta-magicprompt-stable-diffusion.hf.space/api/predict",
-            json={"data": [prompt + ", 3d model"]}
-        )
-        if response.status_code == 200:
-            enhanced_prompt = response.json().get('data', [None])[0]
-            if (enhanced_prompt):
-                return enhanced_prompt.split("\n")[0]
-        return prompt
-
-    def generate_model(self, prompt, seed, guidance_scale, num_inference_steps, model_type, image_width, image_height, api_key):
-        from gradio_client import Client, handle_file
-
-        try:
-            if model_type == "model-shap-e":
-                return self.generate_shape_e_model(api_key, prompt, seed, guidance_scale, num_inference_steps)
-            elif model_type == "model-sdxl-shap-e":
-                return self.generate_sdxl_shape_e_model(api_key, prompt, seed, guidance_scale, num_inference_steps, image_width, image_height)
-            elif model_type == "model-sdxl-dreamgaussian":
-                return self.generate_sdxl_dreamgaussian_model(api_key, prompt, seed, guidance_scale, num_inference_steps, image_width, image_height)
-            elif model_type == "model-sdxl-instantmesh":
-                return self.generate_sdxl_instantmesh_model(api_key, prompt, seed, guidance_scale, num_inference_steps, image_width, image_height)
-            elif model_type == "model-sdxl-triposr":
-                return self.generate_sdxl_triposr_model(api_key, prompt, seed, guidance_scale, num_inference_steps, image_width, image_height)
-        except Exception as e:
-            self.report({'ERROR'}, f"An error occurred: {str(e)}. This could be due to a model hosting issue or an internet connection problem.")
+            print("Autosculptor: No mesh object found among imported children.")
             return None
 
-    def generate_shape_e_model(self, api_key, prompt, seed, guidance_scale, num_inference_steps):
-        from gradio_client import Client
-        
-        client = Client(client_config["shap_e"], hf_token=api_key) if api_key else Client(client_config["shap_e"])
-        result = client.predict(
-            prompt=prompt,
-            seed=seed,
-            guidance_scale=guidance_scale,
-            num_inference_steps=num_inference_steps,
-            api_name="/text-to-3d"
-        )
-        return result
-
-    def generate_sdxl_shape_e_model(self, api_key, prompt, seed, guidance_scale, num_inference_steps, image_width, image_height):
-        from gradio_client import Client, handle_file
-        client1 = Client(client_config["sdxl"], hf_token=api_key) if api_key else Client(client_config["sdxl"])
-        image = client1.predict(
-            prompt=prompt,
-            negative_prompt="",
-            prompt_2="",
-            negative_prompt_2="",
-            seed=seed,
-            guidance_scale_base=guidance_scale,
-            num_inference_steps_base=num_inference_steps,
-            width=image_width,
-            height=image_height,
-            api_name="/run"
-        )
-        image_path = image
-
-        client2 = Client(client_config["one_2_3_45"], hf_token=api_key) if api_key else Client(client_config["one_2_3_45"])
-        segmented_img_filepath = client2.predict(
-            image_path,
-            api_name="/preprocess"
-        )
-
-        client3 = Client(client_config["shap_e"], hf_token=api_key) if api_key else Client(client_config["shap_e"])
-        result = client3.predict(
-            image=handle_file(segmented_img_filepath),
-            seed=seed,
-            guidance_scale=guidance_scale,
-            num_inference_steps=num_inference_steps,
-            api_name="/image-to-3d"
-        )
-        return result
-
-    def generate_sdxl_dreamgaussian_model(self, api_key, prompt, seed, guidance_scale, num_inference_steps, image_width, image_height):
-        from gradio_client import Client, handle_file
-        client1 = Client(client_config["sdxl"], hf_token=api_key) if api_key else Client(client_config["sdxl"])
-        image = client1.predict(
-            prompt=prompt,
-            negative_prompt="",
-            prompt_2="",
-            negative_prompt_2="",
-            seed=seed,
-            guidance_scale_base=guidance_scale,
-            num_inference_steps_base=num_inference_steps,
-            width=image_width,
-            height=image_height,
-            api_name="/run"
-        )
-        image_path = image
-
-        client2 = Client(client_config["one_2_3_45"], hf_token=api_key) if api_key else Client(client_config["one_2_3_45"])
-        elevation_angle_deg = client2.predict(
-            image_path,
-            True,
-            api_name="/estimate_elevation"
-        )
-
-        if elevation_angle_deg < -90 or elevation_angle_deg > 90:
-            elevation_angle_deg = 0
-
-        client3 = Client(client_config["dreamgaussian"], hf_token=api_key) if api_key else Client(client_config["dreamgaussian"])
-        result = client3.predict(
-            image_path,
-            True, 
-            elevation_angle_deg,
-            fn_index=2
-        )
-        return result
-
-    def generate_sdxl_instantmesh_model(self, api_key, prompt, seed, guidance_scale, num_inference_steps, image_width, image_height):
-        from gradio_client import Client, handle_file
-        client1 = Client(client_config["sdxl"], hf_token=api_key) if api_key else Client(client_config["sdxl"])
-        image = client1.predict(
-            prompt=prompt,
-            negative_prompt="",
-            prompt_2="",
-            negative_prompt_2="",
-            seed=seed,
-            guidance_scale_base=guidance_scale,
-            num_inference_steps_base=num_inference_steps,
-            width=image_width,
-            height=image_height,
-            api_name="/run"
-        )
-        image_path = image
-
-        client2 = Client(client_config["instantmesh"], hf_token=api_key) if api_key else Client(client_config["instantmesh"])
-        processed_image = client2.predict(
-            input_image=handle_file(image_path),
-            do_remove_background=True,
-            api_name="/preprocess"
-        )
-
-        mvs = client2.predict(
-            input_image=handle_file(processed_image),
-            sample_steps=num_inference_steps,
-            sample_seed=seed,
-            api_name="/generate_mvs"
-        )
-
-        result = client2.predict(
-            api_name="/make3d"
-        )
-        return result[1]
-    
-    def generate_sdxl_triposr_model(self, api_key, prompt, seed, guidance_scale, num_inference_steps, image_width, image_height):
-        from gradio_client import Client, handle_file
-        client1 = Client(client_config["sdxl"], hf_token=api_key) if api_key else Client(client_config["sdxl"])
-        image = client1.predict(
-            prompt=prompt,
-            negative_prompt="",
-            prompt_2="",
-            negative_prompt_2="",
-            seed=seed,
-            guidance_scale_base=guidance_scale,
-            num_inference_steps_base=num_inference_steps,
-            width=image_width,
-            height=image_height,
-            api_name="/run"
-        )
-        image_path = image
-
-        client2 = Client(client_config["triposr"], hf_token=api_key) if api_key else Client(client_config["triposr"])
-        processed_image = client2.predict(
-            handle_file(image_path),
-            True,
-            0.5,
-            api_name="/preprocess"
-        )
-        
-        result = client2.predict(
-            handle_file(processed_image),
-            320,
-            api_name="/generate"
-        )
-
-        return result[1]
-
-    def assign_material(self, obj):
-        material = bpy.data.materials.new(name="ImportedMaterial")
-        material.use_nodes = True
-
-        bsdf = next((node for node in material.node_tree.nodes if isinstance(node, bpy.types.ShaderNodeBsdfPrincipled)), None)
-        if not bsdf:
-            bsdf = material.node_tree.nodes.new(type='ShaderNodeBsdfPrincipled')
-
-        attribute_node = material.node_tree.nodes.new('ShaderNodeVertexColor')
-        if obj.data.vertex_colors:
-            attribute_node.layer_name = obj.data.vertex_colors[0].name
-        else:
-            attribute_node.layer_name = "Color"
-
-        material.node_tree.links.new(attribute_node.outputs['Color'], bsdf.inputs['Base Color'])
-
-        if obj.data.materials:
-            obj.data.materials[0] = material
-        else:
-            obj.data.materials.append(material)
+    return obj
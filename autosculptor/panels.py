@@ -1,7 +1,8 @@
 import bpy
 from bpy.types import Panel
 from .utils import ensure_gradio_installed
-from .operators import GeneratorOperator
+from .jobs import job_manager, QUEUED, RUNNING
+from .telemetry import telemetry
 
 class GeneratorPanel(Panel):
     bl_label = "Autosculptor"
@@ -23,15 +24,40 @@ class GeneratorPanel(Panel):
                 autosculptor_props.update_estimated_time(context)
             
             layout.prop(autosculptor_props, "prompt")
-            layout.prop(autosculptor_props, "model_type")
+            layout.label(text="Models")
+            layout.column(align=True).prop(autosculptor_props, "model_types", expand=True)
 
             box = layout.box()
             box.prop(autosculptor_props, "show_advanced", text="Advanced Settings", emboss=False, icon='TRIA_DOWN' if autosculptor_props.show_advanced else 'TRIA_RIGHT')
             
             if autosculptor_props.show_advanced:
                 box.prop(autosculptor_props, "prompt_enhancer")
+
+                row = box.row()
+                row.enabled = autosculptor_props.prompt_enhancer
+                row.prop(autosculptor_props, "prompt_enhancer_timeout")
+
                 box.prop(autosculptor_props, "apply_material")
 
+                row = box.row()
+                row.enabled = autosculptor_props.apply_material
+                row.prop(autosculptor_props, "bake_atlas")
+
+                row = box.row()
+                row.enabled = autosculptor_props.apply_material and autosculptor_props.bake_atlas
+                row.prop(autosculptor_props, "atlas_size")
+
+                box.operator("object.autosculptor_deduplicate_materials", icon='MATERIAL')
+                box.prop(autosculptor_props, "fast_import")
+
+                row = box.row()
+                row.enabled = autosculptor_props.fast_import
+                row.prop(autosculptor_props, "post_process")
+
+                row = box.row()
+                row.enabled = autosculptor_props.fast_import and autosculptor_props.post_process
+                row.prop(autosculptor_props, "target_faces")
+
                 row = box.row()
                 row.enabled = not autosculptor_props.random_seed
                 row.prop(autosculptor_props, "seed")
@@ -43,7 +69,57 @@ class GeneratorPanel(Panel):
                 box.prop(autosculptor_props, "image_height")
                 box.prop(autosculptor_props, "run_in_thread")
                 box.prop(autosculptor_props, "batch_count")
+                box.prop(autosculptor_props, "max_workers")
+                box.prop(autosculptor_props, "max_retries")
+                box.prop(autosculptor_props, "import_budget_ms")
+                box.prop(autosculptor_props, "use_cache")
+
+                row = box.row()
+                row.enabled = autosculptor_props.use_cache
+                row.prop(autosculptor_props, "cache_size")
+
+                box.prop(autosculptor_props, "max_download_size")
+                box.prop(autosculptor_props, "profile_import")
                 box.prop(autosculptor_props, "api_key")
 
             layout.label(text=f"Estimated time: {autosculptor_props.estimated_time}")
-            layout.operator("object.autosculptor_model_generator", text="Generating..." if GeneratorOperator.generating else "Generate 3D Model", icon='MESH_DATA')
+            layout.operator("object.autosculptor_model_generator", text="Queue 3D Model" if job_manager.busy() else "Generate 3D Model", icon='MESH_DATA')
+
+            if job_manager.jobs:
+                box = layout.box()
+                box.label(text="Generations")
+                for job in reversed(job_manager.jobs):
+                    row = box.row()
+                    row.label(text=job.settings["prompt"] or "(empty prompt)")
+                    if job.state == RUNNING:
+                        row.label(text=f"{job.status()} {int(job.progress * 100)}%")
+                    else:
+                        row.label(text=job.status())
+                    if job.state in (QUEUED, RUNNING):
+                        row.operator("object.autosculptor_cancel_job", text="", icon='CANCEL').job_id = job.id
+
+                    if job.state == RUNNING:
+                        remote = job.remote_status()
+                        if remote["rank"] is not None:
+                            box.label(text=f"Queue position: {remote['rank'] + 1}")
+                        if remote["eta"] is not None:
+                            box.label(text=f"Stage ETA: ~{int(remote['eta'])}s")
+
+                        image = bpy.data.images.get(job.preview_image or "")
+                        if image and hasattr(image, "preview_ensure"):
+                            image.preview_ensure()
+                            box.template_icon(icon_value=image.preview.icon_id, scale=6)
+                    if job.messages:
+                        box.label(text=job.messages[-1], icon='ERROR')
+
+            summary = telemetry.summary()
+            if summary:
+                box = layout.box()
+                box.prop(autosculptor_props, "show_timings", text="Timings", emboss=False, icon='TRIA_DOWN' if autosculptor_props.show_timings else 'TRIA_RIGHT')
+                if autosculptor_props.show_timings:
+                    for model_type, spans in summary.items():
+                        box.label(text=model_type or "Other")
+                        for name, timing in spans.items():
+                            row = box.row()
+                            row.label(text=name)
+                            row.label(text=f"p50 {timing['p50']:.1f}s  p95 {timing['p95']:.1f}s  ({timing['count']})")
@@ -0,0 +1,400 @@
+import time
+import queue
+import threading
+import traceback
+from contextlib import contextmanager
+from .clients import client_pool
+from .monitor import remote_monitor
+from .retry import circuit_breaker, CircuitOpen
+from .telemetry import telemetry
+from .artifacts import artifact_store
+
+# Clients API config, entries can be pointed at other hosts (mirrors, local stub servers) with configure_spaces
+client_config = {
+    "shap_e": "hysts/Shap-E",
+    "sdxl": "hysts/SDXL",
+    "one_2_3_45": "https://one-2-3-45-one-2-3-45.hf.space/",
+    "dreamgaussian": "https://jiawei011-dreamgaussian.hf.space/",
+    "instantmesh": "TencentARC/InstantMesh",
+    "triposr": "stabilityai/TripoSR"
+}
+
+# Optional mirrors or duplicated Spaces, tried in order when the main Space keeps failing
+client_alternates = {
+    "shap_e": [],
+    "sdxl": [],
+    "one_2_3_45": [],
+    "dreamgaussian": [],
+    "instantmesh": [],
+    "triposr": []
+}
+
+# Stages read their inputs from a shared item dict and store their outputs back into it,
+# so an item can be handed from one stage queue to the next. Intermediate files stay on the
+# Space as URLs where the next Space can fetch them, models are downloaded for the import.
+
+class Cancelled(Exception):
+    pass
+
+class CancelToken:
+    # Shared by all items of a generation job, cancelling it also cancels the gradio jobs in flight
+
+    def __init__(self):
+        self.cancelled = False
+        self._jobs = set()
+        self._event = threading.Event()
+        self._lock = threading.Lock()
+
+    def cancel(self):
+        with self._lock:
+            self.cancelled = True
+            jobs = list(self._jobs)
+        self._event.set()
+        for job in jobs:
+            try:
+                job.cancel()
+            except Exception:
+                pass
+
+    def check(self):
+        if self.cancelled:
+            raise Cancelled()
+
+    def wait(self, timeout):
+        # Sleeps for timeout seconds unless the job gets cancelled first
+        return self._event.wait(timeout)
+
+    def attach(self, job):
+        with self._lock:
+            if not self.cancelled:
+                self._jobs.add(job)
+                return
+        job.cancel()
+        raise Cancelled()
+
+    def detach(self, job):
+        with self._lock:
+            self._jobs.discard(job)
+
+def predict(client, item, *args, **kwargs):
+    # Submits instead of calling client.predict so a running call can be watched and cancelled
+    job = client.submit(*args, **kwargs)
+    remote_monitor.watch(job, item)
+    token = item.get("cancel")
+    try:
+        if token is not None:
+            token.attach(job)
+        return artifact_store.reference(job.result())
+    except Exception:
+        if token is not None and token.cancelled:
+            raise Cancelled()
+        raise
+    finally:
+        if token is not None:
+            token.detach(job)
+        record_remote_spans(remote_monitor.unwatch(job), item)
+
+def record_remote_spans(entry, item):
+    # Splits a remote call into the time spent in the Space queue and the time spent running and downloading,
+    # to the precision of the monitor polling interval
+    if entry is None:
+        return
+    fields = {"stage": entry["stage"], "model_type": item.get("model_type", ""), "seed": item.get("seed")}
+    end = time.monotonic()
+    started = entry["started"] if entry["started"] is not None else entry["submitted"]
+    if entry["started"] is not None:
+        telemetry.record("queue", started - entry["submitted"], **fields)
+    telemetry.record("remote", end - started, **fields)
+
+def configure_spaces(spaces=None, alternates=None):
+    client_config.update(spaces or {})
+    client_alternates.update(alternates or {})
+
+def select_space(name):
+    for space in [client_config[name]] + client_alternates.get(name, []):
+        if circuit_breaker.allow(space):
+            return space
+    raise CircuitOpen(f"All endpoints for {name} are failing, waiting before trying again.")
+
+@contextmanager
+def space_client(name, item):
+    space = select_space(name)
+    try:
+        # A client that cannot be created (sleeping, paused or overloaded Space) counts as a failure too
+        with client_pool.client(space, item["api_key"]) as client:
+            yield client
+    except Cancelled:
+        # No verdict on the Space, another trial call may go through
+        circuit_breaker.release(space)
+        raise
+    except Exception:
+        circuit_breaker.record_failure(space)
+        raise
+    circuit_breaker.record_success(space)
+
+def stage(space, params=(), inputs=(), output="model_path"):
+    # Declares the Space a stage calls and which generation parameters and upstream artifacts determine its output
+    def decorator(fn):
+        fn.space = space
+        fn.params = params
+        fn.inputs = inputs
+        fn.output = output
+        return fn
+    return decorator
+
+@stage("shap_e", params=("prompt", "seed", "guidance_scale", "num_inference_steps"))
+def shap_e_text_to_3d(item):
+    with space_client("shap_e", item) as client:
+        model = predict(
+            client,
+            item,
+            prompt=item["prompt"],
+            seed=item["seed"],
+            guidance_scale=item["guidance_scale"],
+            num_inference_steps=item["num_inference_steps"],
+            api_name="/text-to-3d"
+        )
+    item["model_path"] = artifact_store.local(model, item["api_key"])
+
+@stage("sdxl", params=("prompt", "seed", "guidance_scale", "num_inference_steps", "image_width", "image_height"), output="image_path")
+def sdxl_text_to_image(item):
+    with space_client("sdxl", item) as client:
+        item["image_path"] = predict(
+            client,
+            item,
+            prompt=item["prompt"],
+            negative_prompt="",
+            prompt_2="",
+            negative_prompt_2="",
+            seed=item["seed"],
+            guidance_scale_base=item["guidance_scale"],
+            num_inference_steps_base=item["num_inference_steps"],
+            width=item["image_width"],
+            height=item["image_height"],
+            api_name="/run"
+        )
+
+@stage("one_2_3_45", inputs=("image_path",), output="processed_image_path")
+def one_2_3_45_preprocess(item):
+    with space_client("one_2_3_45", item) as client:
+        # Older Gradio Spaces get plain file paths, not references
+        item["processed_image_path"] = predict(
+            client,
+            item,
+            artifact_store.local(item["image_path"], item["api_key"]),
+            api_name="/preprocess"
+        )
+
+@stage("one_2_3_45", inputs=("image_path",), output="elevation")
+def one_2_3_45_estimate_elevation(item):
+    with space_client("one_2_3_45", item) as client:
+        elevation_angle_deg = predict(
+            client,
+            item,
+            artifact_store.local(item["image_path"], item["api_key"]),
+            True,
+            api_name="/estimate_elevation"
+        )
+
+    if elevation_angle_deg < -90 or elevation_angle_deg > 90:
+        elevation_angle_deg = 0
+    item["elevation"] = elevation_angle_deg
+
+@stage("shap_e", params=("seed", "guidance_scale", "num_inference_steps"), inputs=("processed_image_path",))
+def shap_e_image_to_3d(item):
+    from gradio_client import handle_file
+    with space_client("shap_e", item) as client:
+        model = predict(
+            client,
+            item,
+            image=handle_file(item["processed_image_path"]),
+            seed=item["seed"],
+            guidance_scale=item["guidance_scale"],
+            num_inference_steps=item["num_inference_steps"],
+            api_name="/image-to-3d"
+        )
+    item["model_path"] = artifact_store.local(model, item["api_key"])
+
+@stage("dreamgaussian", inputs=("image_path", "elevation"))
+def dreamgaussian_image_to_3d(item):
+    with space_client("dreamgaussian", item) as client:
+        model = predict(
+            client,
+            item,
+            artifact_store.local(item["image_path"], item["api_key"]),
+            True,
+            item["elevation"],
+            fn_index=2
+        )
+    item["model_path"] = artifact_store.local(model, item["api_key"])
+
+@stage("instantmesh", inputs=("image_path",), output="processed_image_path")
+def instantmesh_preprocess(item):
+    from gradio_client import handle_file
+    with space_client("instantmesh", item) as client:
+        item["processed_image_path"] = predict(
+            client,
+            item,
+            input_image=handle_file(item["image_path"]),
+            do_remove_background=True,
+            api_name="/preprocess"
+        )
+
+@stage("instantmesh", params=("seed", "num_inference_steps"), inputs=("processed_image_path",))
+def instantmesh_image_to_3d(item):
+    from gradio_client import handle_file
+    # /make3d reads the multiview images from the session, so both calls must share a client
+    with space_client("instantmesh", item) as client:
+        predict(
+            client,
+            item,
+            input_image=handle_file(item["processed_image_path"]),
+            sample_steps=item["num_inference_steps"],
+            sample_seed=item["seed"],
+            api_name="/generate_mvs"
+        )
+        result = predict(
+            client,
+            item,
+            api_name="/make3d"
+        )
+    item["model_path"] = artifact_store.local(result[1], item["api_key"])
+
+@stage("triposr", inputs=("image_path",), output="processed_image_path")
+def triposr_preprocess(item):
+    from gradio_client import handle_file
+    with space_client("triposr", item) as client:
+        item["processed_image_path"] = predict(
+            client,
+            item,
+            handle_file(item["image_path"]),
+            True,
+            0.5,
+            api_name="/preprocess"
+        )
+
+@stage("triposr", inputs=("processed_image_path",))
+def triposr_image_to_3d(item):
+    from gradio_client import handle_file
+    with space_client("triposr", item) as client:
+        result = predict(
+            client,
+            item,
+            handle_file(item["processed_image_path"]),
+            320,
+            api_name="/generate"
+        )
+    item["model_path"] = artifact_store.local(result[1], item["api_key"])
+
+def fan_out(branches, on_branch_progress=None, on_branch_error=None):
+    # Runs the remaining stages of several pipelines at the same time on copies of an item, once the stages
+    # they share are done. Models land in item["models"] by branch name, a failed branch only drops itself.
+    def fan_out_stage(item):
+        item["models"] = {}
+
+        def run_branch(name, stages):
+            branch = dict(item, model_type=name, cache_keys=dict(item.get("cache_keys", {})))
+            done = 0
+            try:
+                for stage in stages:
+                    if branch.get("cancel"):
+                        branch["cancel"].check()
+                    branch["stage"] = stage.__name__
+                    stage(branch)
+                    done += 1
+                    if on_branch_progress:
+                        on_branch_progress(branch, stage)
+                item["models"][name] = branch["model_path"]
+            except Exception as e:
+                if on_branch_error:
+                    on_branch_error(branch, e, len(stages) - done)
+
+        threads = [threading.Thread(target=run_branch, args=(name, stages), daemon=True) for name, stages in branches.items()]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    fan_out_stage.space = None
+    fan_out_stage.params = ()
+    fan_out_stage.inputs = ()
+    fan_out_stage.output = "models"
+    return fan_out_stage
+
+def run_stages(stages, item):
+    for stage in stages:
+        if item.get("cancel"):
+            item["cancel"].check()
+        item["stage"] = stage.__name__
+        stage(item)
+    return item["model_path"]
+
+def run_staged(stages, items, workers=1, on_result=None, on_error=None, on_progress=None):
+    # Each stage has its own queue and workers, so item N+1 can be in SDXL while item N is being reconstructed
+    if not items:
+        return
+
+    queues = [queue.Queue() for _ in stages]
+    remaining = [len(items)]
+    lock = threading.Lock()
+    finished = threading.Event()
+
+    def finish():
+        with lock:
+            remaining[0] -= 1
+            if remaining[0] == 0:
+                finished.set()
+
+    def notify(callback, *args):
+        # A failing callback must not kill the worker, its queued items would never finish
+        if not callback:
+            return
+        try:
+            callback(*args)
+        except Exception:
+            traceback.print_exc()
+
+    def worker(index):
+        stage = stages[index]
+        while True:
+            item = queues[index].get()
+            if item is None:
+                return
+
+            try:
+                if item.get("cancel"):
+                    item["cancel"].check()
+                item["stage"] = stage.__name__
+                stage(item)
+            except Exception as e:
+                # Only this item is dropped, the rest of the batch keeps flowing
+                notify(on_error, item, e)
+                finish()
+                continue
+
+            notify(on_progress, item, index)
+
+            if index + 1 < len(stages):
+                queues[index + 1].put(item)
+                continue
+
+            notify(on_result, item)
+            finish()
+
+    threads = [
+        threading.Thread(target=worker, args=(index,), daemon=True)
+        for index in range(len(stages))
+        for _ in range(workers)
+    ]
+    for thread in threads:
+        thread.start()
+
+    for item in items:
+        queues[0].put(item)
+
+    finished.wait()
+    for stage_queue in queues:
+        for _ in range(workers):
+            stage_queue.put(None)
+    for thread in threads:
+        thread.join()
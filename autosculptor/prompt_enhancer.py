@@ -0,0 +1,109 @@
+import os
+import json
+import time
+import threading
+
+MAGICPROMPT_URL = "https://gustavosta-magicprompt-stable-diffusion.hf.space/api/predict"
+
+class PromptEnhancer:
+    # MagicPrompt client with a persistent session, timeouts and a prompt -> enhanced prompt memo table (memory and disk)
+
+    def __init__(self, url=MAGICPROMPT_URL, connect_timeout=5, read_timeout=30, ttl=7 * 24 * 3600, memo_path=None):
+        self.url = url
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.ttl = ttl
+        self.memo_path = memo_path
+        self.hits = 0
+        self.misses = 0
+        self.failures = 0
+        self.latencies = []
+        self._memo = None
+        self._session = None
+        self._lock = threading.Lock()
+
+    def configure(self, **options):
+        with self._lock:
+            if "memo_path" in options and options["memo_path"] != self.memo_path:
+                self._memo = None
+            for name, value in options.items():
+                setattr(self, name, value)
+
+    def enhance(self, prompt):
+        now = time.time()
+        with self._lock:
+            entry = self._load_memo().get(prompt)
+            if entry and now - entry["time"] < self.ttl:
+                self.hits += 1
+                return entry["value"]
+            self.misses += 1
+
+        start = time.monotonic()
+        try:
+            response = self._get_session().post(
+                self.url,
+                json={"data": [prompt + ", 3d model"]},
+                timeout=(self.connect_timeout, self.read_timeout)
+            )
+            enhanced_prompt = None
+            if response.status_code == 200:
+                enhanced_prompt = response.json().get('data', [None])[0]
+        except Exception:
+            # Timeouts and connection errors fall back to the raw prompt
+            enhanced_prompt = None
+
+        with self._lock:
+            self.latencies.append(time.monotonic() - start)
+            if not enhanced_prompt:
+                self.failures += 1
+                return prompt
+
+            enhanced_prompt = enhanced_prompt.split("\n")[0]
+            self._load_memo()[prompt] = {"value": enhanced_prompt, "time": now}
+            self._save_memo()
+            return enhanced_prompt
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "failures": self.failures,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "mean_latency": sum(self.latencies) / len(self.latencies) if self.latencies else 0.0,
+                "max_latency": max(self.latencies, default=0.0)
+            }
+
+    def _get_session(self):
+        if self._session is None:
+            import requests
+            self._session = requests.Session()
+        return self._session
+
+    def _load_memo(self):
+        if self._memo is None:
+            self._memo = {}
+            if self.memo_path and os.path.isfile(self.memo_path):
+                try:
+                    with open(self.memo_path, "r", encoding="utf-8") as file:
+                        self._memo = json.load(file)
+                except (OSError, ValueError):
+                    self._memo = {}
+        return self._memo
+
+    def _save_memo(self):
+        if not self.memo_path:
+            return
+
+        # Drop expired entries so the file does not grow forever
+        now = time.time()
+        self._memo = {prompt: entry for prompt, entry in self._memo.items() if now - entry["time"] < self.ttl}
+        try:
+            with open(self.memo_path + ".tmp", "w", encoding="utf-8") as file:
+                json.dump(self._memo, file)
+            os.replace(self.memo_path + ".tmp", self.memo_path)
+        except OSError:
+            pass
+
+prompt_enhancer = PromptEnhancer()
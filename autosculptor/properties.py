@@ -1,5 +1,10 @@
 import bpy
+import os
 from bpy.types import PropertyGroup
+from .engine import registry, model_type_items
+from .monitor import remote_monitor
+from .estimator import eta_estimator
+from .utils import get_data_dir
 
 class GeneratorProperties(PropertyGroup):
     prompt: bpy.props.StringProperty(
@@ -11,6 +16,13 @@ class GeneratorProperties(PropertyGroup):
         description="Enhance the prompt for better results",
         default=False
     )
+    prompt_enhancer_timeout: bpy.props.IntProperty(
+        name="Enhancer Timeout (s)",
+        description="Maximum time to wait for the prompt enhancer before using the original prompt",
+        default=30,
+        min=1,
+        max=300
+    )
     seed: bpy.props.IntProperty(
         name="Seed",
         description="Seed for generation",
@@ -35,38 +47,71 @@ class GeneratorProperties(PropertyGroup):
         description="Number of inference steps for generation",
         default=64,
         min=2,
-        max=100
+        max=100,
+        update=lambda self, context: self.update_estimated_time(context)
     )
     image_width: bpy.props.IntProperty(
         name="Image Width",
         description="Width of the generated image",
         default=1024,
         min=256,
-        max=1024
+        max=1024,
+        update=lambda self, context: self.update_estimated_time(context)
     )
     image_height: bpy.props.IntProperty(
         name="Image Height",
         description="Height of the generated image",
         default=1024,
         min=256,
-        max=1024
+        max=1024,
+        update=lambda self, context: self.update_estimated_time(context)
     )
     apply_material: bpy.props.BoolProperty(
         name="Apply Material",
         description="Apply material to the generated model",
         default=True
     )
+    bake_atlas: bpy.props.BoolProperty(
+        name="Bake Texture Atlas",
+        description="Bake the vertex colors of a batch into one shared texture and material once all its models are imported (uses Cycles)",
+        default=False
+    )
+    atlas_size: bpy.props.IntProperty(
+        name="Atlas Size",
+        description="Width and height of the baked texture atlas in pixels",
+        default=2048,
+        min=256,
+        max=8192
+    )
+    fast_import: bpy.props.BoolProperty(
+        name="Fast Import",
+        description="Build simple generated meshes directly from the GLB data instead of using the glTF importer",
+        default=True
+    )
+    post_process: bpy.props.BoolProperty(
+        name="Post-process Mesh",
+        description="Merge duplicate vertices, decimate dense meshes and recompute normals before importing (needs Fast Import)",
+        default=False
+    )
+    target_faces: bpy.props.IntProperty(
+        name="Target Faces",
+        description="Maximum number of triangles after decimation, 0 uses the preset of the selected model",
+        default=0,
+        min=0,
+        max=1000000
+    )
     model_type: bpy.props.EnumProperty(
         name="Model",
-        description="Model pipeline to use for generation",
-        items=[
-            ("model-shap-e", "Shap-E", "hysts/Shap-E (~13s)"),
-            ("model-sdxl-shap-e", "SDXL + Shap-E", "hysts/SDXL + hysts/Shap-E (~30s)"),
-            ("model-sdxl-dreamgaussian", "SDXL + DreamGaussian", "hysts/SDXL + jiawei011/dreamgaussian (~600s)"),
-            ("model-sdxl-instantmesh", "SDXL + InstantMesh", "hysts/SDXL + TencentARC/InstantMesh (~60s)"),
-            ("model-sdxl-triposr", "SDXL + TripoSR", "hysts/SDXL + stabilityai/TripoSR (~30s)")
-        ],
-        default="model-shap-e",
+        description="Model pipeline used by files saved before several models could be selected, read once into Models",
+        items=model_type_items(),
+        default="model-shap-e"
+    )
+    model_types: bpy.props.EnumProperty(
+        name="Models",
+        description="Model pipelines to use for generation, SDXL pipelines selected together share the same image (Shift+Click to select several)",
+        items=model_type_items(),
+        options={'ENUM_FLAG'},
+        default={"model-shap-e"},
         update=lambda self, context: self.update_estimated_time(context)
     )
     batch_count: bpy.props.IntProperty(
@@ -92,23 +137,85 @@ class GeneratorProperties(PropertyGroup):
         description="Run the model generation in a separate thread",
         default=False
     )
+    max_workers: bpy.props.IntProperty(
+        name="Concurrent Jobs",
+        description="Maximum number of batch items generated in parallel (keep low to avoid Hugging Face rate limits)",
+        default=1,
+        min=1,
+        max=4,
+        update=lambda self, context: self.update_estimated_time(context)
+    )
+    max_retries: bpy.props.IntProperty(
+        name="Retries per Stage",
+        description="Number of times a failing pipeline stage is retried, with increasing delays, before the batch item is dropped",
+        default=2,
+        min=0,
+        max=5
+    )
+    import_budget_ms: bpy.props.IntProperty(
+        name="Import Budget (ms)",
+        description="Time per UI update spent importing finished models, remaining models are imported on the next updates",
+        default=20,
+        min=1,
+        max=1000
+    )
+    use_cache: bpy.props.BoolProperty(
+        name="Use Cache",
+        description="Reuse previously generated images and models for identical settings",
+        default=True
+    )
+    cache_size: bpy.props.IntProperty(
+        name="Cache Size (MB)",
+        description="Maximum disk space used by the result cache",
+        default=2048,
+        min=64,
+        max=65536
+    )
+    show_timings: bpy.props.BoolProperty(
+        name="Show Timings",
+        description="Show the p50/p95 duration of each pipeline stage and of the import",
+        default=False
+    )
+    profile_import: bpy.props.BoolProperty(
+        name="Profile Import",
+        description="Run cProfile around each model import and save the stats in the add-on data folder",
+        default=False
+    )
+    max_download_size: bpy.props.IntProperty(
+        name="Max Download (MB)",
+        description="Largest file accepted from a Space, larger models are dropped instead of filling the disk",
+        default=512,
+        min=1,
+        max=8192
+    )
     api_key: bpy.props.StringProperty(
         name="HF Token",
         description="User Access Token for Hugging Face to get a higher priority in queues",
-        default=""
+        default="",
+        update=lambda self, context: self.update_estimated_time(context)
     )
 
     def update_estimated_time(self, context):
-        model_times = {
-            "model-shap-e": 13,
-            "model-sdxl-shap-e": 30,
-            "model-sdxl-dreamgaussian": 600,
-            "model-sdxl-instantmesh": 60,
-            "model-sdxl-triposr": 30
+        specs = [spec for model_type, spec in registry.items() if model_type in self.model_types]
+
+        eta_estimator.configure(os.path.join(get_data_dir(), "eta_samples.json"))
+        settings = {
+            "num_inference_steps": self.num_inference_steps,
+            "image_width": self.image_width,
+            "image_height": self.image_height,
+            "api_key": self.api_key
         }
-        time_per_model = model_times.get(self.model_type, 0)
-        total_time = time_per_model * self.batch_count
-        self.estimated_time = f"~{total_time}s"
+        # Stage durations reported by the Spaces reflect their current load, learned ones the past runs
+        total_time, source = eta_estimator.predict(specs, settings, self.batch_count, self.max_workers, remote_monitor.stage_eta)
+
+        estimated_time = f"~{int(total_time)}s" + (f" ({source})" if source != "static" else "")
+        if self.estimated_time != estimated_time:
+            self.estimated_time = estimated_time
+
+    def migrate_model_type(self):
+        # Files saved with the single model selector only store model_type, copy it over the first time they are opened
+        if self.is_property_set("model_type") and not self.is_property_set("model_types") and self.model_type in registry:
+            self.model_types = {self.model_type}
 
     def init(self, context):
         self.update_estimated_time(context)
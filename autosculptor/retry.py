@@ -0,0 +1,91 @@
+import time
+import random
+import threading
+from functools import wraps
+from .artifacts import ArtifactTooLarge
+
+class CircuitOpen(Exception):
+    pass
+
+class CircuitBreaker:
+    # Stops sending calls to a Space after repeated failures, then lets a single trial call through once reset_timeout has passed
+
+    def __init__(self, failure_threshold=3, reset_timeout=60):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._states = {}
+        self._lock = threading.Lock()
+
+    def allow(self, space):
+        with self._lock:
+            state = self._states.get(space)
+            if state is None or state["opened"] is None:
+                return True
+            if time.monotonic() - state["opened"] >= self.reset_timeout and not state["trial_in_flight"]:
+                # Half-open: the circuit stays open for everyone else until this trial call reports back
+                state["trial_in_flight"] = True
+                return True
+            return False
+
+    def release(self, space):
+        # Called once a cancelled call ends without a verdict, so another trial can go through
+        with self._lock:
+            state = self._states.get(space)
+            if state is not None:
+                state["trial_in_flight"] = False
+
+    def record_success(self, space):
+        with self._lock:
+            self._states.pop(space, None)
+
+    def record_failure(self, space):
+        with self._lock:
+            state = self._states.setdefault(space, {"failures": 0, "opened": None, "trial_in_flight": False})
+            state["failures"] += 1
+            state["trial_in_flight"] = False
+            if state["failures"] >= self.failure_threshold:
+                state["opened"] = time.monotonic()
+
+    def is_open(self, space):
+        with self._lock:
+            state = self._states.get(space)
+            return bool(state and state["opened"] is not None)
+
+class RetryPolicy:
+    def __init__(self, attempts=3, base_delay=2.0, max_delay=60.0):
+        self.attempts = attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def delay(self, attempt):
+        # Exponential backoff with full jitter, so parallel batch items do not retry in lockstep
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+def is_transient(error):
+    # Programming errors, missing dependencies and oversized outputs will fail the same way on every attempt,
+    # Space errors (overload, queue full, 5xx) may not
+    return not isinstance(error, (TypeError, KeyError, AttributeError, ImportError, ArtifactTooLarge))
+
+def retrying_stage(stage, policy):
+    # Retries a single stage, keeping whatever the upstream stages already stored on the item
+    @wraps(stage)
+    def wrapper(item):
+        token = item.get("cancel")
+        for attempt in range(policy.attempts):
+            try:
+                return stage(item)
+            except Exception as e:
+                if token is not None and token.cancelled:
+                    raise
+                if attempt + 1 >= policy.attempts or not is_transient(e):
+                    raise
+                delay = policy.delay(attempt)
+                print(f"Autosculptor: {stage.__name__} failed ({str(e)}), retrying in {delay:.1f}s")
+                if token is not None:
+                    token.wait(delay)
+                    token.check()
+                else:
+                    time.sleep(delay)
+    return wrapper
+
+circuit_breaker = CircuitBreaker()
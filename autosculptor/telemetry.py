@@ -0,0 +1,119 @@
+import os
+import json
+import time
+import threading
+import collections
+from functools import wraps
+from contextlib import contextmanager
+
+class Telemetry:
+    # Timing spans for every stage, client construction, remote queue wait and import, kept in a
+    # ring buffer for the panel summary and appended to a JSONL log rotated once it reaches max_bytes.
+
+    def __init__(self, max_spans=2000, max_bytes=5 * 1024 * 1024, backups=3):
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.log_path = None
+        self.spans = collections.deque(maxlen=max_spans)
+        self._lock = threading.Lock()
+
+    def configure(self, log_path=None):
+        with self._lock:
+            self.log_path = log_path
+
+    @contextmanager
+    def span(self, name, **fields):
+        start = time.perf_counter()
+        status = "ok"
+        try:
+            yield fields
+        except BaseException as e:
+            status = type(e).__name__
+            raise
+        finally:
+            self.record(name, time.perf_counter() - start, status=status, **fields)
+
+    def record(self, name, duration, status="ok", **fields):
+        span = {"name": name, "time": time.time(), "duration": duration, "status": status}
+        span.update(fields)
+        with self._lock:
+            self.spans.append(span)
+            if self.log_path:
+                try:
+                    self._write(span)
+                except OSError as e:
+                    print(f"Autosculptor: could not write telemetry log: {str(e)}")
+
+    def summary(self):
+        # Duration percentiles of successful spans, by model type then span name
+        with self._lock:
+            spans = list(self.spans)
+
+        durations = {}
+        for span in spans:
+            if span["status"] != "ok":
+                continue
+            model_type = span.get("model_type", "")
+            durations.setdefault(model_type, {}).setdefault(span["name"], []).append(span["duration"])
+
+        return {
+            model_type: {
+                name: {"count": len(values), "p50": percentile(values, 0.5), "p95": percentile(values, 0.95)}
+                for name, values in names.items()
+            }
+            for model_type, names in durations.items()
+        }
+
+    def clear(self):
+        with self._lock:
+            self.spans.clear()
+
+    @contextmanager
+    def profile(self, name, directory, enabled=True):
+        # Runs cProfile around the block and saves the stats next to the log, for snakeviz or pstats
+        if not enabled:
+            yield None
+            return
+
+        import cProfile
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            yield profiler
+        finally:
+            profiler.disable()
+            os.makedirs(directory, exist_ok=True)
+            path = os.path.join(directory, f"{name}-{time.strftime('%Y%m%d-%H%M%S')}-{id(profiler):x}.prof")
+            profiler.dump_stats(path)
+            print(f"Autosculptor: profile written to {path}")
+
+    def _write(self, span):
+        if os.path.isfile(self.log_path) and os.path.getsize(self.log_path) >= self.max_bytes:
+            self._rotate()
+        with open(self.log_path, "a", encoding="utf-8") as file:
+            file.write(json.dumps(span, default=str) + "\n")
+
+    def _rotate(self):
+        # telemetry.jsonl -> telemetry.jsonl.1 -> ... -> telemetry.jsonl.<backups>
+        for index in range(self.backups - 1, 0, -1):
+            source = f"{self.log_path}.{index}"
+            if os.path.isfile(source):
+                os.replace(source, f"{self.log_path}.{index + 1}")
+        if self.backups:
+            os.replace(self.log_path, f"{self.log_path}.1")
+        else:
+            os.remove(self.log_path)
+
+def timed_stage(stage):
+    # Records one span per stage call, including the retries and cache lookups wrapped inside it
+    @wraps(stage)
+    def wrapper(item):
+        with telemetry.span(stage.__name__, model_type=item.get("model_type", ""), seed=item.get("seed"), space=getattr(stage, "space", "")):
+            return stage(item)
+    return wrapper
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(fraction * (len(values) - 1))))]
+
+telemetry = Telemetry()
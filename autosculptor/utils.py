@@ -1,14 +1,94 @@
+import os
 import sys
+import time
+import shutil
+import threading
 import subprocess
+import importlib
+import importlib.util
+import bpy
+from .telemetry import telemetry
+
+# Packages installed by the add-on, bump DEPENDENCIES_VERSION when this list changes so they are installed again
+REQUIREMENTS = ["gradio_client"]
+DEPENDENCIES_VERSION = 1
+
+# Modules imported in the background after registration, so the first generation does not pay for them
+WARM_IMPORTS = ["requests", "gradio_client"]
+
+# find_spec results, probed once instead of importing on every panel redraw
+dependency_status = {}
+
+def site_packages_dir():
+    # Isolated from Blender's own site-packages, one folder per Python and dependency version
+    name = f"py{sys.version_info.major}{sys.version_info.minor}-v{DEPENDENCIES_VERSION}"
+    return os.path.join(get_data_dir(), "site-packages", name)
+
+def add_site_packages():
+    # Appended rather than prepended, so packages bundled with Blender (numpy, requests) keep priority
+    path = site_packages_dir()
+    if os.path.isdir(path) and path not in sys.path:
+        sys.path.append(path)
+        invalidate_dependencies()
+
+def is_installed(module):
+    if module not in dependency_status:
+        start = time.perf_counter()
+        try:
+            dependency_status[module] = importlib.util.find_spec(module) is not None
+        except (ImportError, ValueError):
+            dependency_status[module] = False
+        telemetry.record("probe", time.perf_counter() - start, module=module)
+    return dependency_status[module]
+
+def invalidate_dependencies():
+    dependency_status.clear()
+    importlib.invalidate_caches()
 
 def ensure_gradio_installed():
-    try:
-        import gradio_client
-        return True
-    except ImportError:
-        return False
+    return is_installed("gradio_client")
 
 def install_gradio():
     python_executable = sys.executable
+    target = site_packages_dir()
+    staging = target + ".tmp"
+    shutil.rmtree(staging, ignore_errors=True)
+
     subprocess.check_call([python_executable, '-m', 'ensurepip'])
-    subprocess.check_call([python_executable, '-m', 'pip', 'install', 'gradio_client'])
+    subprocess.check_call([python_executable, '-m', 'pip', 'install', '--upgrade', '--target', staging] + REQUIREMENTS)
+
+    # Swap the folder in once pip succeeded, and drop the folders of older dependency versions
+    shutil.rmtree(target, ignore_errors=True)
+    os.replace(staging, target)
+    parent = os.path.dirname(target)
+    for name in os.listdir(parent):
+        path = os.path.join(parent, name)
+        if path != target and path not in sys.path:
+            shutil.rmtree(path, ignore_errors=True)
+
+    add_site_packages()
+    invalidate_dependencies()
+
+def warm_imports():
+    # Imports the heavy modules on a background thread, the timings end up in the telemetry log
+    def run():
+        for module in WARM_IMPORTS:
+            if module in sys.modules or not is_installed(module):
+                continue
+            start = time.perf_counter()
+            try:
+                importlib.import_module(module)
+            except Exception as e:
+                print(f"Autosculptor: could not import {module}: {str(e)}")
+                continue
+            telemetry.record("warm_import", time.perf_counter() - start, module=module)
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    return thread
+
+def get_data_dir():
+    return bpy.utils.user_resource('DATAFILES', path="autosculptor", create=True)
+
+def get_cache_dir():
+    return bpy.utils.user_resource('DATAFILES', path=os.path.join("autosculptor", "cache"), create=True)
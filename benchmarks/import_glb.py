@@ -0,0 +1,111 @@
+# Compares the fast GLB loader with bpy.ops.import_scene.gltf.
+#
+# Usage:
+#   blender --background --factory-startup --python benchmarks/import_glb.py -- [model.glb] [--repeat 5] [--segments 256]
+#
+# Without a model path, a synthetic vertex-colored sphere is written to a temporary file.
+
+import os
+import sys
+import json
+import time
+import struct
+import argparse
+import tempfile
+import bpy
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from autosculptor.mesh_loader import load_glb
+
+def write_sphere_glb(path, segments):
+    rings = segments // 2
+    theta = np.linspace(0, np.pi, rings + 1)
+    phi = np.linspace(0, 2 * np.pi, segments, endpoint=False)
+    theta, phi = np.meshgrid(theta, phi, indexing="ij")
+    positions = np.stack((np.sin(theta) * np.cos(phi), np.cos(theta), np.sin(theta) * np.sin(phi)), axis=-1).reshape(-1, 3).astype(np.float32)
+    colors = np.hstack(((positions + 1) / 2, np.ones((len(positions), 1)))).astype(np.float32)
+
+    ring = np.arange(rings)[:, None] * segments
+    column = np.arange(segments)[None, :]
+    a = ring + column
+    b = ring + (column + 1) % segments
+    c = a + segments
+    d = b + segments
+    indices = np.stack((a, c, b, b, c, d), axis=-1).reshape(-1).astype(np.uint32)
+
+    blobs = [positions.tobytes(), colors.tobytes(), indices.tobytes()]
+    views = []
+    offset = 0
+    for blob in blobs:
+        views.append({"buffer": 0, "byteOffset": offset, "byteLength": len(blob)})
+        offset += len(blob)
+    binary = b"".join(blobs)
+
+    gltf = {
+        "asset": {"version": "2.0"},
+        "scene": 0,
+        "scenes": [{"nodes": [0]}],
+        "nodes": [{"children": [1]}, {"mesh": 0}],
+        "meshes": [{"primitives": [{"attributes": {"POSITION": 0, "COLOR_0": 1}, "indices": 2}]}],
+        "buffers": [{"byteLength": len(binary)}],
+        "bufferViews": views,
+        "accessors": [
+            {"bufferView": 0, "componentType": 5126, "count": len(positions), "type": "VEC3",
+             "min": positions.min(axis=0).tolist(), "max": positions.max(axis=0).tolist()},
+            {"bufferView": 1, "componentType": 5126, "count": len(colors), "type": "VEC4"},
+            {"bufferView": 2, "componentType": 5125, "count": len(indices), "type": "SCALAR"}
+        ]
+    }
+    json_chunk = json.dumps(gltf).encode("utf-8")
+    json_chunk += b" " * (-len(json_chunk) % 4)
+    binary += b"\0" * (-len(binary) % 4)
+
+    with open(path, "wb") as file:
+        file.write(struct.pack("<III", 0x46546C67, 2, 12 + 8 + len(json_chunk) + 8 + len(binary)))
+        file.write(struct.pack("<II", len(json_chunk), 0x4E4F534A) + json_chunk)
+        file.write(struct.pack("<II", len(binary), 0x004E4942) + binary)
+    return len(positions), len(indices) // 3
+
+def clear_scene():
+    for obj in list(bpy.data.objects):
+        bpy.data.objects.remove(obj)
+    for mesh in list(bpy.data.meshes):
+        bpy.data.meshes.remove(mesh)
+
+def measure(function, path, repeat):
+    timings = []
+    for _ in range(repeat):
+        clear_scene()
+        start = time.perf_counter()
+        function(path)
+        timings.append(time.perf_counter() - start)
+    clear_scene()
+    return {"min": min(timings), "mean": sum(timings) / len(timings), "runs": timings}
+
+def main():
+    argv = sys.argv[sys.argv.index("--") + 1:] if "--" in sys.argv else []
+    parser = argparse.ArgumentParser()
+    parser.add_argument("path", nargs="?")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--segments", type=int, default=256)
+    args = parser.parse_args(argv)
+
+    path = args.path
+    info = {}
+    if path is None:
+        path = os.path.join(tempfile.mkdtemp(), "sphere.glb")
+        vertices, faces = write_sphere_glb(path, args.segments)
+        info = {"vertices": vertices, "faces": faces}
+
+    results = {
+        "blender": bpy.app.version_string,
+        "model": path,
+        **info,
+        "gltf_operator": measure(lambda filepath: bpy.ops.import_scene.gltf(filepath=filepath), path, args.repeat),
+        "fast_loader": measure(load_glb, path, args.repeat)
+    }
+    results["speedup"] = results["gltf_operator"]["min"] / results["fast_loader"]["min"]
+    print(json.dumps(results, indent=2))
+
+main()
@@ -0,0 +1,167 @@
+# Load test of the generation pipelines against local mock Spaces.
+#
+# Usage:
+#   python benchmarks/load_test.py [--latency 0.5] [--payload-kb 256] [--repeat 3] [--items 8] [--concurrency 1 2 4] [--output results.json]
+#
+# Measures gradio client construction cost, per-stage overhead on top of the mocked Space latency,
+# end-to-end latency per pipeline (cold and warm client pool) and batch throughput at each
+# concurrency level. Needs gradio and gradio_client, but not Blender.
+
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from mock_spaces import MockSpaces
+from autosculptor.pipeline import configure_spaces, run_staged
+from autosculptor.clients import client_pool
+from autosculptor.engine import Engine, registry, DEFAULT_SETTINGS
+
+# Number of remote calls each stage makes, to separate the mocked latency from the client overhead
+CALLS_PER_STAGE = {
+    "instantmesh_image_to_3d": 2
+}
+
+def percentile(values, fraction):
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(fraction * (len(values) - 1))))]
+
+def summarize(values):
+    return {
+        "count": len(values),
+        "mean": sum(values) / len(values) if values else None,
+        "p50": percentile(values, 0.5),
+        "p95": percentile(values, 0.95),
+        "min": min(values) if values else None,
+        "max": max(values) if values else None
+    }
+
+def measure_client_construction(urls, repeat):
+    from gradio_client import Client
+
+    results = {}
+    for name, url in urls.items():
+        durations = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            Client(url, verbose=False)
+            durations.append(time.perf_counter() - start)
+        results[name] = summarize(durations)
+    return results
+
+def measure_pipeline(engine, model_type, latency, repeat):
+    stages = registry[model_type].stages
+    end_to_end = {"cold": [], "warm": []}
+    overhead = {stage.__name__: [] for stage in stages}
+
+    for run in range(repeat + 1):
+        # The first run starts with an empty client pool, the next ones reuse its clients
+        if run == 0:
+            client_pool.clear()
+        item = engine.make_item(DEFAULT_SETTINGS, "a wooden chair", run)
+        total = 0.0
+        for stage in stages:
+            item["stage"] = stage.__name__
+            start = time.perf_counter()
+            stage(item)
+            duration = time.perf_counter() - start
+            total += duration
+            if run > 0:
+                overhead[stage.__name__].append(duration - latency * CALLS_PER_STAGE.get(stage.__name__, 1))
+        end_to_end["cold" if run == 0 else "warm"].append(total)
+
+    return {
+        "end_to_end": {key: summarize(values) for key, values in end_to_end.items()},
+        "stage_overhead": {name: summarize(values) for name, values in overhead.items()}
+    }
+
+def measure_throughput(engine, model_type, items_count, levels):
+    stages = registry[model_type].stages
+    results = {}
+    for workers in levels:
+        latencies = []
+        failures = []
+        items = []
+        for seed in range(items_count):
+            items.append(engine.make_item(DEFAULT_SETTINGS, "a wooden chair", seed))
+
+        def on_result(item):
+            latencies.append(time.perf_counter() - item["submitted"])
+
+        def on_error(item, e):
+            failures.append(str(e))
+
+        client_pool.reset_stats()
+        start = time.perf_counter()
+        for item in items:
+            item["submitted"] = start
+        run_staged(stages, items, workers=workers, on_result=on_result, on_error=on_error)
+        duration = time.perf_counter() - start
+
+        results[str(workers)] = {
+            "duration": duration,
+            "items_per_second": len(latencies) / duration if duration else None,
+            "item_latency": summarize(latencies),
+            "failures": len(failures),
+            "errors": failures[:5],
+            "client_pool": client_pool.stats()
+        }
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the Autosculptor pipelines against local mock Spaces.")
+    parser.add_argument("--latency", type=float, default=0.5, help="Seconds each mocked endpoint waits before answering")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Random latency variation in seconds")
+    parser.add_argument("--payload-kb", type=int, default=256, help="Size of the files returned by the mocks in KB")
+    parser.add_argument("--base-port", type=int, default=7870)
+    parser.add_argument("--repeat", type=int, default=3, help="Warm runs per measurement")
+    parser.add_argument("--items", type=int, default=8, help="Items per throughput batch")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 2, 4], help="Workers per stage to measure throughput at")
+    parser.add_argument("--model-type", nargs="+", choices=list(registry), default=list(registry), help="Pipelines to measure")
+    parser.add_argument("--output", help="JSON file receiving the results (defaults to stdout)")
+    args = parser.parse_args()
+
+    spaces = MockSpaces(args.latency, args.jitter, args.payload_kb * 1024, args.base_port)
+    urls = spaces.start()
+    configure_spaces(urls)
+    engine = Engine()
+
+    try:
+        results = {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "config": {
+                "latency": args.latency,
+                "jitter": args.jitter,
+                "payload_kb": args.payload_kb,
+                "repeat": args.repeat,
+                "items": args.items,
+                "concurrency": args.concurrency
+            },
+            "client_construction": measure_client_construction(urls, args.repeat),
+            "pipelines": {}
+        }
+        for model_type in args.model_type:
+            print(f"Measuring {model_type}", file=sys.stderr)
+            result = measure_pipeline(engine, model_type, args.latency, args.repeat)
+            result["throughput"] = measure_throughput(engine, model_type, args.items, args.concurrency)
+            results["pipelines"][model_type] = result
+    finally:
+        spaces.stop()
+
+    output = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            file.write(output)
+    else:
+        print(output)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+# Local stand-ins for the Hugging Face Spaces used by the pipelines.
+#
+# Each mock Space exposes the same endpoints and parameter names as the real one, waits for a
+# configurable latency and returns files of a configurable size. Requires the gradio package
+# (pip install gradio), which is only needed for benchmarking.
+#
+# Usage:
+#   python benchmarks/mock_spaces.py --latency 0.5 --payload-kb 256
+
+import os
+import time
+import random
+import argparse
+import tempfile
+
+class MockSpaces:
+    def __init__(self, latency=0.5, jitter=0.0, payload_size=256 * 1024, base_port=7870):
+        self.latency = latency
+        self.jitter = jitter
+        self.payload_size = payload_size
+        self.base_port = base_port
+        self.directory = tempfile.mkdtemp(prefix="autosculptor-mock-")
+        self.demos = {}
+        self.urls = {}
+
+    def wait(self):
+        time.sleep(max(0.0, self.latency + random.uniform(-self.jitter, self.jitter)))
+
+    def payload(self, suffix):
+        file = tempfile.NamedTemporaryFile(dir=self.directory, suffix=suffix, delete=False)
+        with file:
+            file.write(os.urandom(self.payload_size))
+        return file.name
+
+    def build(self):
+        import gradio as gr
+
+        def text_to_3d(prompt, seed, guidance_scale, num_inference_steps):
+            self.wait()
+            return self.payload(".glb")
+
+        def image_to_3d(image, seed, guidance_scale, num_inference_steps):
+            self.wait()
+            return self.payload(".glb")
+
+        with gr.Blocks() as shap_e:
+            gr.Button().click(
+                text_to_3d,
+                [gr.Textbox(), gr.Number(precision=0), gr.Number(), gr.Number(precision=0)],
+                gr.File(),
+                api_name="text-to-3d"
+            )
+            gr.Button().click(
+                image_to_3d,
+                [gr.File(), gr.Number(precision=0), gr.Number(), gr.Number(precision=0)],
+                gr.File(),
+                api_name="image-to-3d"
+            )
+
+        def run(prompt, negative_prompt, prompt_2, negative_prompt_2, seed, guidance_scale_base, num_inference_steps_base, width, height):
+            self.wait()
+            return self.payload(".png")
+
+        with gr.Blocks() as sdxl:
+            gr.Button().click(
+                run,
+                [gr.Textbox(), gr.Textbox(), gr.Textbox(), gr.Textbox(), gr.Number(precision=0), gr.Number(), gr.Number(precision=0), gr.Number(precision=0), gr.Number(precision=0)],
+                gr.File(),
+                api_name="run"
+            )
+
+        # One-2-3-45 and DreamGaussian receive plain paths from the pipelines, not uploaded files
+        def preprocess_path(image):
+            self.wait()
+            return self.payload(".png")
+
+        def estimate_elevation(image, flag):
+            self.wait()
+            return random.uniform(-30, 30)
+
+        with gr.Blocks() as one_2_3_45:
+            gr.Button().click(preprocess_path, gr.Textbox(), gr.File(), api_name="preprocess")
+            gr.Button().click(estimate_elevation, [gr.Textbox(), gr.Checkbox()], gr.Number(), api_name="estimate_elevation")
+
+        def unused(value):
+            return value
+
+        def dreamgaussian(image, flag, elevation):
+            self.wait()
+            return self.payload(".glb")
+
+        with gr.Blocks() as dreamgaussian_space:
+            # The pipeline calls fn_index=2
+            gr.Button().click(unused, gr.Textbox(), gr.Textbox())
+            gr.Button().click(unused, gr.Textbox(), gr.Textbox())
+            gr.Button().click(dreamgaussian, [gr.Textbox(), gr.Checkbox(), gr.Number()], gr.File())
+
+        def instantmesh_preprocess(input_image, do_remove_background):
+            self.wait()
+            return self.payload(".png")
+
+        def generate_mvs(input_image, sample_steps, sample_seed):
+            self.wait()
+            return self.payload(".png")
+
+        def make3d():
+            self.wait()
+            return self.payload(".obj"), self.payload(".glb")
+
+        with gr.Blocks() as instantmesh:
+            gr.Button().click(instantmesh_preprocess, [gr.File(), gr.Checkbox()], gr.File(), api_name="preprocess")
+            gr.Button().click(generate_mvs, [gr.File(), gr.Number(precision=0), gr.Number(precision=0)], gr.File(), api_name="generate_mvs")
+            gr.Button().click(make3d, None, [gr.File(), gr.File()], api_name="make3d")
+
+        def triposr_preprocess(image, remove_background, foreground_ratio):
+            self.wait()
+            return self.payload(".png")
+
+        def generate(image, mc_resolution):
+            self.wait()
+            return self.payload(".obj"), self.payload(".glb")
+
+        with gr.Blocks() as triposr:
+            gr.Button().click(triposr_preprocess, [gr.File(), gr.Checkbox(), gr.Number()], gr.File(), api_name="preprocess")
+            gr.Button().click(generate, [gr.File(), gr.Number(precision=0)], [gr.File(), gr.File()], api_name="generate")
+
+        self.demos = {
+            "shap_e": shap_e,
+            "sdxl": sdxl,
+            "one_2_3_45": one_2_3_45,
+            "dreamgaussian": dreamgaussian_space,
+            "instantmesh": instantmesh,
+            "triposr": triposr
+        }
+        return self.demos
+
+    def start(self):
+        if not self.demos:
+            self.build()
+        for index, (name, demo) in enumerate(self.demos.items()):
+            demo.queue(default_concurrency_limit=None)
+            demo.launch(server_port=self.base_port + index, prevent_thread_lock=True, quiet=True)
+            self.urls[name] = f"http://127.0.0.1:{self.base_port + index}/"
+        return self.urls
+
+    def stop(self):
+        for demo in self.demos.values():
+            demo.close()
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve mock Spaces for the Autosculptor pipelines.")
+    parser.add_argument("--latency", type=float, default=0.5, help="Seconds each endpoint waits before answering")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Random latency variation in seconds")
+    parser.add_argument("--payload-kb", type=int, default=256, help="Size of the returned files in KB")
+    parser.add_argument("--base-port", type=int, default=7870)
+    args = parser.parse_args()
+
+    spaces = MockSpaces(args.latency, args.jitter, args.payload_kb * 1024, args.base_port)
+    for name, url in spaces.start().items():
+        print(f"{name}: {url}")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        spaces.stop()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+import unittest
+from unittest import mock
+from autosculptor import pipeline
+from autosculptor.clients import client_pool
+from autosculptor.retry import circuit_breaker, retrying_stage, RetryPolicy
+
+class FakeJob:
+    def __init__(self, result):
+        self._result = result
+
+    def status(self):
+        raise RuntimeError("not polled in tests")
+
+    def result(self):
+        return self._result
+
+    def cancel(self):
+        pass
+
+class FakeClient:
+    def __init__(self, space):
+        self.space = space
+
+    def submit(self, *args, **kwargs):
+        return FakeJob(f"{self.space}/image.png")
+
+def create(space, api_key):
+    # The main Space is asleep, only the mirror answers
+    if space == "hysts/SDXL":
+        raise ValueError("Could not fetch config for https://hysts-sdxl.hf.space")
+    return FakeClient(space)
+
+def make_item():
+    return {
+        "prompt": "a wooden chair",
+        "seed": 0,
+        "guidance_scale": 5,
+        "num_inference_steps": 25,
+        "image_width": 1024,
+        "image_height": 1024,
+        "api_key": None
+    }
+
+class FailoverTest(unittest.TestCase):
+    def setUp(self):
+        circuit_breaker._states.clear()
+        client_pool.clear()
+        alternates = mock.patch.dict(pipeline.client_alternates, {"sdxl": ["mirror/SDXL"]})
+        alternates.start()
+        self.addCleanup(alternates.stop)
+        self.addCleanup(circuit_breaker._states.clear)
+        self.addCleanup(client_pool.clear)
+
+    def test_client_creation_failures_open_the_circuit(self):
+        with mock.patch.object(client_pool, "_create", side_effect=create):
+            for _ in range(circuit_breaker.failure_threshold):
+                with self.assertRaises(ValueError):
+                    pipeline.sdxl_text_to_image(make_item())
+
+        self.assertTrue(circuit_breaker.is_open("hysts/SDXL"))
+        self.assertFalse(circuit_breaker.is_open("mirror/SDXL"))
+
+    def test_retries_fail_over_to_the_alternate(self):
+        policy = RetryPolicy(attempts=circuit_breaker.failure_threshold + 1, base_delay=0)
+        stage = retrying_stage(pipeline.sdxl_text_to_image, policy)
+        item = make_item()
+
+        with mock.patch.object(client_pool, "_create", side_effect=create):
+            stage(item)
+
+        self.assertEqual(item["image_path"], "mirror/SDXL/image.png")
+        self.assertTrue(circuit_breaker.is_open("hysts/SDXL"))
+
+    def test_cancelled_calls_do_not_count_as_failures(self):
+        with mock.patch.object(client_pool, "_create", side_effect=pipeline.Cancelled()):
+            for _ in range(circuit_breaker.failure_threshold):
+                with self.assertRaises(pipeline.Cancelled):
+                    pipeline.sdxl_text_to_image(make_item())
+
+        self.assertFalse(circuit_breaker.is_open("hysts/SDXL"))
+
+if __name__ == "__main__":
+    unittest.main()